@@ -0,0 +1,136 @@
+import os
+import sys
+import mmap
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pin_table import PinTable, parse_adr_lines, read_pin_table
+
+# 小于该大小的ADR直接单进程读取，进程启动开销比解析本身更大
+SHARD_MIN_FILE_SIZE = 16 * 1024 * 1024
+# 每个进程分到的分片数，多切几片让进程间负载更均衡
+SHARDS_PER_WORKER = 2
+
+# 分片结果文件中各列的类型，按顺序连续存放；坐标为整数微米（PinTable.xy_um）
+SHARD_COLUMNS = (("no", np.int64), ("x", np.int32), ("y", np.int32),
+                 ("side", np.int32), ("unit", np.int32))
+
+
+def shard_ranges(file_path, shard_count):
+    """
+    将文件按字节切成 shard_count 段，每段边界对齐到换行符之后，
+    保证每一行完整地落在某一个分片内。返回 [(start, stop), ...]。
+    """
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return []
+    shard_count = max(1, min(shard_count, size))
+    starts = [0]
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for k in range(1, shard_count):
+            newline = mm.find(b"\n", max(starts[-1], size * k // shard_count))
+            if newline == -1:
+                break
+            if newline + 1 < size and newline + 1 > starts[-1]:
+                starts.append(newline + 1)
+    stops = starts[1:] + [size]
+    return list(zip(starts, stops))
+
+
+def _parse_shard(file_path, start, stop, output_path):
+    """
+    Worker: parses one byte range and writes its columns to a flat binary file.
+    Only the row count and the side/unit vocabularies travel back through pickling.
+    """
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        data = f.read(stop - start)
+    table = parse_adr_lines(data.decode("utf-8", errors="replace").splitlines())
+    sides, side_codes = np.unique(table.side, return_inverse=True)
+    units, unit_codes = np.unique(table.unit, return_inverse=True)
+    columns = {"no": table.no, "x": table.xy_um[:, 0], "y": table.xy_um[:, 1],
+               "side": side_codes.ravel(), "unit": unit_codes.ravel()}
+    with open(output_path, "wb") as out:
+        for name, dtype in SHARD_COLUMNS:
+            np.asarray(columns[name], dtype=dtype).tofile(out)
+    return len(table), sides.tolist(), units.tolist()
+
+
+def _load_shard(output_path, count):
+    """Maps a shard result file and returns views of its columns."""
+    if count == 0:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in SHARD_COLUMNS}
+    mapped = np.memmap(output_path, dtype=np.uint8, mode="r")
+    columns = {}
+    offset = 0
+    for name, dtype in SHARD_COLUMNS:
+        nbytes = count * np.dtype(dtype).itemsize
+        columns[name] = mapped[offset:offset + nbytes].view(dtype)
+        offset += nbytes
+    return columns
+
+
+def read_pin_table_sharded(file_path, workers=None, min_size=SHARD_MIN_FILE_SIZE):
+    """
+    多进程分片读取ADR文件：按换行对齐的字节区间切分，进程池并行解析，
+    各分片通过内存映射的临时文件返回列数组（不经过pickle），最后按引脚顺序拼接。
+    文件小于 min_size 或只有一个进程可用时退回单进程的 read_pin_table。
+    """
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(file_path)
+    if workers <= 1 or size < min_size:
+        return read_pin_table(file_path)
+
+    ranges = shard_ranges(file_path, workers * SHARDS_PER_WORKER)
+    temp_dir = tempfile.mkdtemp(prefix="adr_shards_")
+    try:
+        outputs = [os.path.join(temp_dir, f"shard_{k:04d}.bin") for k in range(len(ranges))]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_parse_shard, file_path, start, stop, output)
+                       for (start, stop), output in zip(ranges, outputs)]
+            results = [future.result() for future in futures]
+
+        total = sum(count for count, _, _ in results)
+        merged = {name: np.empty(total, dtype=dtype) for name, dtype in SHARD_COLUMNS}
+        side_vocab, unit_vocab = {}, {}
+        position = 0
+        for output, (count, sides, units) in zip(outputs, results):
+            columns = _load_shard(output, count)
+            end = position + count
+            for name in ("no", "x", "y"):
+                merged[name][position:end] = columns[name]
+            # 各分片的面/单元字典不同，映射到全局编码
+            side_map = np.array([side_vocab.setdefault(s, len(side_vocab)) for s in sides], dtype=np.int32)
+            unit_map = np.array([unit_vocab.setdefault(u, len(unit_vocab)) for u in units], dtype=np.int32)
+            if count:
+                merged["side"][position:end] = side_map[columns["side"]]
+                merged["unit"][position:end] = unit_map[columns["unit"]]
+            del columns
+            position = end
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    side_names = np.array(list(side_vocab), dtype=str)
+    unit_names = np.array(list(unit_vocab), dtype=str)
+    table = PinTable.from_um(merged["no"], np.column_stack((merged["x"], merged["y"])),
+                             side_names[merged["side"]], unit_names[merged["unit"]])
+    print(f"Successfully read ADR file with {len(table)} pins in {len(ranges)} shards", file=sys.stderr)
+    return table
+
+
+if __name__ == "__main__":
+    import time
+    import multiprocessing
+
+    multiprocessing.freeze_support()
+    if len(sys.argv) < 2:
+        print("Usage: python adr_sharded.py <adr_file> [workers]", file=sys.stderr)
+        sys.exit(1)
+
+    worker_count = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    began = time.perf_counter()
+    result = read_pin_table_sharded(sys.argv[1], worker_count, min_size=0)
+    print(f"Parsed {len(result)} pins in {time.perf_counter() - began:.3f}s", file=sys.stderr)
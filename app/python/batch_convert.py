@@ -0,0 +1,192 @@
+import os
+import re
+import sys
+import json
+import time
+import fnmatch
+import traceback
+import multiprocessing
+
+DEFAULT_TIMEOUT = 300.0
+POLL_INTERVAL = 0.2
+
+# 治具库命名约定：<JIG>-TOP-JIGUNIT1.rut / <JIG>-BOT-JIGUNIT2.rut ... 以及 <JIG>.ADR
+RUT_PATTERN = re.compile(r"^(?P<jig>.+)-(?P<side>TOP|BOT)-JIGUNIT(?P<unit>\d+)\.rut$", re.IGNORECASE)
+ADR_PATTERN = re.compile(r"^(?P<jig>.+)\.adr$", re.IGNORECASE)
+
+
+def discover_jigs(library_dir):
+    """
+    递归扫描治具库目录，按命名约定把RUT单元和ADR文件归到各治具名下。
+    治具以 (所在目录, 治具名) 区分：不同子目录中的同名治具（例如 v1/ 和 v2/ 两个版本）是不同的治具，
+    键为相对目录加治具名（如 "v1/G8360-TEST"），库根目录中的治具键就是治具名。
+    返回 {key: {'name', 'directory', 'rut_files': [...], 'adr_file': path or None}}，RUT按 TOP/BOT 和单元号排序。
+    """
+    jigs = {}
+    for root, dirs, files in os.walk(library_dir):
+        dirs.sort()
+        directory = os.path.relpath(root, library_dir).replace(os.sep, "/")
+        if directory == ".":
+            directory = ""
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            match = RUT_PATTERN.match(name) or ADR_PATTERN.match(name)
+            if not match:
+                continue
+            jig = match.group("jig")
+            key = f"{directory}/{jig}" if directory else jig
+            entry = jigs.setdefault(key, {'name': jig, 'directory': directory, 'rut_files': [], 'adr_file': None})
+            if match.re is RUT_PATTERN:
+                entry['rut_files'].append((match.group("side").upper() != "TOP", int(match.group("unit")), path))
+            else:
+                entry['adr_file'] = path
+
+    for entry in jigs.values():
+        entry['rut_files'] = [path for _, _, path in sorted(entry['rut_files'])]
+    return dict(sorted(jigs.items()))
+
+
+def _write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def process_jig(jig, rut_files, adr_file, jig_dir):
+    """
+    处理单个治具并写出产物：jig.json（与json_script输出相同的结构）、checks.json（引脚与轮廓检查）。
+    在子进程中运行，stderr重定向到 convert.log；结果写入 result.json 供主进程汇总。
+    """
+    os.makedirs(jig_dir, exist_ok=True)
+    result = {'jig': jig, 'status': 'error', 'timings': {}}
+    with open(os.path.join(jig_dir, "convert.log"), "w", encoding="utf-8") as log:
+        sys.stderr = log
+        try:
+            # 延迟导入，主进程只负责调度
+            from json_script import load_jig_geometry, build_output
+            from pin_check import check_pins
+            from outline_check import check_outlines
+
+            began = time.perf_counter()
+            units, pin_table = load_jig_geometry(rut_files, adr_file, adr_workers=1)
+            result['timings']['load'] = round(time.perf_counter() - began, 3)
+
+            began = time.perf_counter()
+            _write_json(os.path.join(jig_dir, "jig.json"), build_output(units, pin_table, adr_file))
+            result['timings']['write'] = round(time.perf_counter() - began, 3)
+
+            began = time.perf_counter()
+            checks = {'outlines': check_outlines([(name, coords.tolist()) for name, coords in units])}
+            if pin_table is not None:
+                checks['pins'] = check_pins(pin_table)
+            _write_json(os.path.join(jig_dir, "checks.json"), checks)
+            result['timings']['checks'] = round(time.perf_counter() - began, 3)
+
+            result['summary'] = {
+                'units': len(units),
+                'pins': len(pin_table) if pin_table is not None else 0,
+                'outline_intersections': len(checks['outlines']['intersections']),
+                'pins_ok': checks['pins']['ok'] if 'pins' in checks else None,
+            }
+            warnings = [f"no coordinates in {name}" for name, coords in units if len(coords) == 0]
+            if adr_file is None:
+                warnings.append("no ADR file found")
+            if warnings:
+                result['warnings'] = warnings
+            result['artifacts'] = ["jig.json", "checks.json", "convert.log"]
+            result['status'] = 'ok'
+        except Exception as e:
+            result['error'] = str(e)
+            traceback.print_exc(file=log)
+        finally:
+            _write_json(os.path.join(jig_dir, "result.json"), result)
+
+
+def run_batch(library_dir, output_dir, workers=None, timeout=DEFAULT_TIMEOUT, pattern="*"):
+    """
+    并行处理治具库中的所有治具：每个治具一个子进程，同时最多运行 workers 个；
+    超时的子进程被终止，崩溃或出错的治具不影响其他治具。最后写出 manifest.json。
+    """
+    workers = workers or os.cpu_count() or 1
+    jigs = {key: entry for key, entry in discover_jigs(library_dir).items()
+            if fnmatch.fnmatch(entry['name'], pattern) or fnmatch.fnmatch(key, pattern)}
+    os.makedirs(output_dir, exist_ok=True)
+    started_at = time.strftime("%Y-%m-%d %H:%M:%S")
+    batch_began = time.perf_counter()
+
+    pending = list(jigs.items())
+    running = {}
+    entries = {}
+
+    def finish(name, status=None, error=None):
+        process, began, jig_dir = running.pop(name)
+        elapsed = round(time.perf_counter() - began, 3)
+        result_path = os.path.join(jig_dir, "result.json")
+        if status is None and os.path.exists(result_path):
+            with open(result_path, encoding="utf-8") as f:
+                entry = json.load(f)
+        else:
+            entry = {'jig': name, 'status': status or 'error',
+                     'error': error or f"worker exited with code {process.exitcode}"}
+        entry['seconds'] = elapsed
+        entry['directory'] = jigs[name]['directory']
+        entry['rut_files'] = jigs[name]['rut_files']
+        entry['adr_file'] = jigs[name]['adr_file']
+        entries[name] = entry
+        print(f"[{entry['status']}] {name} ({elapsed:.1f}s)", file=sys.stderr)
+
+    while pending or running:
+        while pending and len(running) < workers:
+            name, entry = pending.pop(0)
+            # 子目录中的治具输出到同样的相对路径下，同名治具不会互相覆盖
+            jig_dir = os.path.join(output_dir, *name.split("/"))
+            os.makedirs(jig_dir, exist_ok=True)
+            stale = os.path.join(jig_dir, "result.json")
+            if os.path.exists(stale):
+                os.remove(stale)
+            process = multiprocessing.Process(target=process_jig,
+                                              args=(name, entry['rut_files'], entry['adr_file'], jig_dir))
+            process.start()
+            running[name] = (process, time.perf_counter(), jig_dir)
+
+        time.sleep(POLL_INTERVAL)
+        now = time.perf_counter()
+        for name, (process, began, _) in list(running.items()):
+            if not process.is_alive():
+                process.join()
+                finish(name)
+            elif now - began > timeout:
+                process.terminate()
+                process.join()
+                finish(name, 'timeout', f"exceeded {timeout:.0f}s")
+
+    ordered = [entries[name] for name in jigs]
+    manifest = {
+        'library': os.path.abspath(library_dir),
+        'started': started_at,
+        'finished': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'seconds': round(time.perf_counter() - batch_began, 3),
+        'workers': workers,
+        'timeout': timeout,
+        'counts': {status: sum(1 for e in ordered if e['status'] == status) for status in ('ok', 'error', 'timeout')},
+        'jigs': ordered,
+    }
+    _write_json(os.path.join(output_dir, "manifest.json"), manifest)
+    return manifest
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    if len(sys.argv) < 3:
+        print("Usage: python batch_convert.py <library_dir> <output_dir> "
+              "[--workers N] [--timeout seconds] [--pattern JIG*]", file=sys.stderr)
+        sys.exit(1)
+
+    options = dict(zip(sys.argv[3::2], sys.argv[4::2]))
+    summary = run_batch(sys.argv[1], sys.argv[2],
+                        workers=int(options["--workers"]) if "--workers" in options else None,
+                        timeout=float(options.get("--timeout", DEFAULT_TIMEOUT)),
+                        pattern=options.get("--pattern", "*"))
+    print(json.dumps({key: summary[key] for key in ('seconds', 'counts')}))
+    sys.exit(0 if summary['counts']['ok'] == len(summary['jigs']) else 2)
@@ -0,0 +1,227 @@
+import re
+import sys
+
+import numpy as np
+
+from json_script import (read_rut_file_for_offset, extract_coordinates, process_jig_unit,
+                         build_unit_transform)
+import transform
+from outline_check import build_segments, find_intersections
+
+# 圆角连接时弧线与理想圆弧的最大弦高误差（mm）
+DEFAULT_ARC_TOLERANCE = 0.005
+DEFAULT_MITER_LIMIT = 4.0
+# 偏移路径上的点到原轮廓的距离比刀具半径小超过该值时，认为刀具在该处切入了工件（mm）
+GOUGE_TOLERANCE = 1e-4
+
+TOOL_PATTERN = re.compile(r"\(T(\d+)C(\d+(?:\.\d+)?)")
+PHI_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*Phi", re.IGNORECASE)
+
+
+def read_tool_header(file_path):
+    """
+    读取RUT头部的刀具信息和刀补方向，例如 `(T95C2.0/UP 2.0Phi;count:1)` 与其后的 `G42`。
+    返回 {'tool': 'T95', 'diameter': 2.0, 'compensation': 'G42'}；缺失的字段为 None。
+    """
+    header = {'tool': None, 'diameter': None, 'compensation': None}
+    with open(file_path, "r") as file:
+        for line in file:
+            line = line.strip()
+            if header['diameter'] is None and line.startswith("("):
+                match = TOOL_PATTERN.search(line)
+                if match:
+                    header['tool'] = f"T{match.group(1)}"
+                    header['diameter'] = float(match.group(2))
+                else:
+                    match = PHI_PATTERN.search(line)
+                    if match:
+                        header['diameter'] = float(match.group(1))
+            elif line.startswith(("G41", "G42")):
+                header['compensation'] = line[:3]
+                break
+            elif line.startswith("G40"):
+                break
+    return header
+
+
+def _dedupe(points):
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:] = np.any(np.diff(points, axis=0) != 0, axis=1)
+    return points[keep]
+
+
+def offset_outline(coords, distance, join="round", arc_tolerance=DEFAULT_ARC_TOLERANCE,
+                   miter_limit=DEFAULT_MITER_LIMIT):
+    """
+    将折线沿行进方向右侧偏移 distance（负值为左侧），所有顶点一次向量化计算。
+    内侧拐角取两条偏移线的交点（斜接点）；外侧拐角用圆弧连接（join="round"，与圆形刀具实际切出的边一致），
+    或在不超过 miter_limit 时用斜接（join="miter"）。首尾相同的折线按闭合轮廓处理，结果同样首尾闭合。
+    """
+    points = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    closed = len(points) > 2 and (points[0] == points[-1]).all()
+    points = _dedupe(points)
+    if closed and len(points) > 1 and (points[0] == points[-1]).all():
+        points = points[:-1]
+    if len(points) < 2 or distance == 0:
+        return np.asarray(coords, dtype=np.float64).reshape(-1, 2).copy()
+
+    if closed:
+        edges = np.roll(points, -1, axis=0) - points
+    else:
+        edges = np.diff(points, axis=0)
+    lengths = np.hypot(edges[:, 0], edges[:, 1])
+    normals = np.column_stack((edges[:, 1], -edges[:, 0])) / lengths[:, None]
+
+    # 每个连接顶点的入边和出边
+    if closed:
+        joints = points
+        n_in, n_out = np.roll(normals, 1, axis=0), normals
+        e_in, e_out = np.roll(edges, 1, axis=0), edges
+    else:
+        joints = points[1:-1]
+        n_in, n_out = normals[:-1], normals[1:]
+        e_in, e_out = edges[:-1], edges[1:]
+
+    cross = e_in[:, 0] * e_out[:, 1] - e_in[:, 1] * e_out[:, 0]
+    dot = np.einsum("ij,ij->i", n_in, n_out)
+    denom = 1.0 + dot
+    safe = denom > 1e-9
+    miter = joints + distance * np.where(safe[:, None], (n_in + n_out) / np.where(safe, denom, 1.0)[:, None], n_in)
+
+    outer = cross * distance > 1e-12
+    if join == "miter":
+        ratio = 1.0 / np.sqrt(np.maximum(denom / 2.0, 1e-18))
+        rounded = outer & (ratio > miter_limit)
+    else:
+        rounded = outer
+
+    # 圆弧连接：按弦高误差确定每个拐角的分段数，全部弧点一次生成
+    radius = abs(distance)
+    v_in, v_out = distance * n_in, distance * n_out
+    start_angle = np.arctan2(v_in[:, 1], v_in[:, 0])
+    sweep = np.arctan2(v_in[:, 0] * v_out[:, 1] - v_in[:, 1] * v_out[:, 0], np.einsum("ij,ij->i", v_in, v_out))
+    step = 2.0 * np.arccos(max(-1.0, 1.0 - arc_tolerance / radius)) if radius > arc_tolerance else np.pi / 2
+    segments = np.where(rounded, np.maximum(1, np.ceil(np.abs(sweep) / step)).astype(np.int64), 0)
+    counts = np.where(rounded, segments + 1, 1)  # 圆弧: segments+1 个点；斜接: 1 个点
+
+    owner = np.repeat(np.arange(len(joints)), counts)
+    local = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+    is_arc = rounded[owner]
+    fraction = np.where(is_arc, local / np.maximum(segments[owner], 1), 0.0)
+    angle = start_angle[owner] + sweep[owner] * fraction
+    arc_points = joints[owner] + radius * np.column_stack((np.cos(angle), np.sin(angle)))
+    joined = np.where(is_arc[:, None], arc_points, miter[owner])
+
+    if closed:
+        return np.vstack((joined, joined[:1]))
+    first = points[0] + distance * normals[0]
+    last = points[-1] + distance * normals[-1]
+    return np.vstack((first, joined, last))
+
+
+def _distance_to_polyline(points, polyline):
+    """Minimum distance from each of `points` to the segments of `polyline`."""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    start, end = polyline[:-1], polyline[1:]
+    edge = end - start
+    length_sq = np.maximum(np.einsum("ij,ij->i", edge, edge), 1e-300)
+    rel = points[:, None, :] - start[None, :, :]
+    t = np.clip(np.einsum("pij,ij->pi", rel, edge) / length_sq, 0.0, 1.0)
+    nearest = start[None, :, :] + t[..., None] * edge[None, :, :]
+    return np.hypot(*(points[:, None, :] - nearest).transpose(2, 0, 1)).min(axis=1)
+
+
+def clip_local_loops(edge, source, distance):
+    """
+    去除偏移路径中的局部环：工件上比刀具直径窄的槽或凸起处，相邻偏移线的交点会形成自交的小环，
+    刀具实际上无法切出这部分路径。每个自交点把路径分成两段，若某一段上有顶点到原轮廓 `source`
+    的距离小于刀具半径，该段即为刀具会切入工件的局部环，用交点代替。
+    返回 (clipped_edge, gouges, remaining)：gouges 为被剪掉的环所在的交点，
+    remaining 为剪除后仍存在的自交数（原轮廓本身自交时不为0）。
+    """
+    edge = np.asarray(edge, dtype=np.float64).reshape(-1, 2)
+    source = np.asarray(source, dtype=np.float64).reshape(-1, 2)
+    radius = abs(distance)
+    if len(edge) < 4 or len(source) < 2 or radius == 0:
+        return edge, [], 0
+    closed = (edge[0] == edge[-1]).all()
+
+    def gouges_into(loop):
+        return len(loop) > 0 and _distance_to_polyline(loop, source).min() < radius - GOUGE_TOLERANCE
+
+    gouges = []
+    while True:
+        segments, closed_units, counts = build_segments([("edge", edge.tolist())])
+        crossings = sorted(find_intersections(segments, closed_units, counts),
+                           key=lambda r: abs(r['segment_b'] - r['segment_a']))
+        clipped = False
+        for record in crossings:
+            a, b = sorted((record['segment_a'], record['segment_b']))
+            point = np.array([[record['x'], record['y']]])
+            if gouges_into(edge[a + 1:b + 1]):
+                edge = np.vstack((edge[:a + 1], point, edge[b + 1:]))
+            elif closed and gouges_into(np.vstack((edge[b + 1:-1], edge[:a + 1]))):
+                edge = np.vstack((point, edge[a + 1:b + 1], point))
+            else:
+                continue
+            gouges.append((record['x'], record['y']))
+            clipped = True
+            break
+        if not clipped:
+            return edge, gouges, len(crossings)
+
+
+def compensation_distance(header):
+    """Signed offset for offset_outline: +radius for G42 (right), -radius for G41 (left), 0 otherwise."""
+    if not header['diameter'] or header['compensation'] not in ("G41", "G42"):
+        return 0.0
+    radius = header['diameter'] / 2.0
+    return radius if header['compensation'] == "G42" else -radius
+
+
+def load_cut_edges(rut_files, alignment=None, join="round"):
+    """
+    计算每个RUT单元的实际切削边：在原始程序坐标中（镜像之前，G41/G42 的左右才有意义）
+    对切角后的轮廓按刀具半径偏移并剪除局部环（clip_local_loops），再套用与 load_jig_geometry 相同的单元变换。
+    返回 [{'filename', 'coords', 'tool', 'diameter', 'compensation', 'gouges', 'self_intersections'}]：
+    gouges 为比刀具直径窄、刀具无法按程序切出的位置（变换后坐标），self_intersections 为剪除后仍有的自交数。
+    """
+    cut_edges = []
+    for file_path in rut_files:
+        try:
+            header = read_tool_header(file_path)
+            x_offset, y_offset = read_rut_file_for_offset(file_path)
+            processed = process_jig_unit(extract_coordinates(file_path), 0.0, 0.0)
+            distance = compensation_distance(header)
+            edge = offset_outline(processed, distance, join=join)
+            edge, gouges, remaining = clip_local_loops(edge, processed, distance)
+            matrix = build_unit_transform(file_path, x_offset, y_offset, alignment)
+            coords = transform.apply_transform(matrix, edge) if len(edge) else edge
+            gouges = transform.apply_transform(matrix, np.asarray(gouges).reshape(-1, 2)).tolist() if gouges else []
+            if gouges or remaining:
+                print(f"Warning: cut edge of {file_path} has {len(gouges)} gouge(s) narrower than the tool "
+                      f"and {remaining} remaining self-intersection(s)", file=sys.stderr)
+            cut_edges.append({'filename': file_path.replace("\\", "/").split("/")[-1],
+                              'coords': [tuple(p) for p in coords.tolist()],
+                              'tool': header['tool'], 'diameter': header['diameter'],
+                              'compensation': header['compensation'],
+                              'gouges': [{'x': round(x, 6), 'y': round(y, 6)} for x, y in gouges],
+                              'self_intersections': remaining})
+        except (OSError, ValueError) as e:
+            print(f"Error computing cut edge for {file_path}: {str(e)}", file=sys.stderr)
+    return cut_edges
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python cutter_compensation.py <rut_files...> [--join round|miter]", file=sys.stderr)
+        sys.exit(1)
+
+    import json
+    args = sys.argv[1:]
+    join = "round"
+    if "--join" in args:
+        position = args.index("--join")
+        join = args[position + 1] if position + 1 < len(args) else join
+        del args[position:position + 2]
+    print(json.dumps(load_cut_edges(args, join=join)))
@@ -0,0 +1,454 @@
+import sys
+import json
+import math
+import time
+from collections import deque
+
+import numpy as np
+
+from pin_table import read_pin_table
+
+DEFAULT_TIME_BUDGET = 10.0
+NEIGHBOUR_COUNT = 8
+# KD树叶节点最多容纳的点数；k近邻按叶节点批量计算距离矩阵，叶节点大一些可减少Python循环次数
+LEAF_SIZE = 16
+NEIGHBOUR_LEAF_SIZE = 64
+
+
+def path_length(xy, start=(0.0, 0.0)):
+    """Total rapid travel from `start` through all points of `xy` in order."""
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    if len(xy) == 0:
+        return 0.0
+    steps = np.diff(np.vstack((np.asarray(start, dtype=np.float64), xy)), axis=0)
+    return float(np.hypot(steps[:, 0], steps[:, 1]).sum())
+
+
+class _KDTree:
+    """
+    静态二维KD树：按包围盒较长的一边在中位数处切分，叶节点最多 LEAF_SIZE 个点。
+    切分只依赖点的分布，密集的连接器区域、成排的孔和远处的孤立孔都保持 O(log n) 的深度，
+    不像均匀网格那样依赖孔的平均密度。
+    节点以平行列表保存：点范围 [start, stop)（对应 index 中的位置）、子节点、父节点和包围盒。
+    """
+
+    def __init__(self, xy, leaf_size=LEAF_SIZE):
+        self.xy = xy
+        n = len(xy)
+        self.index = np.arange(n)
+        self.start, self.stop, self.left, self.right, self.parent = [], [], [], [], []
+        self.x0, self.y0, self.x1, self.y1 = [], [], [], []
+        self.leaves = []
+        pending = [(0, n, -1)]
+        while pending:
+            start, stop, parent = pending.pop()
+            node = len(self.start)
+            pts = xy[self.index[start:stop]]
+            lo, hi = pts.min(axis=0), pts.max(axis=0)
+            self.start.append(start)
+            self.stop.append(stop)
+            self.parent.append(parent)
+            self.x0.append(float(lo[0]))
+            self.y0.append(float(lo[1]))
+            self.x1.append(float(hi[0]))
+            self.y1.append(float(hi[1]))
+            self.left.append(-1)
+            self.right.append(-1)
+            if parent >= 0:
+                if self.left[parent] < 0:
+                    self.left[parent] = node
+                else:
+                    self.right[parent] = node
+            if stop - start <= leaf_size:
+                self.leaves.append(node)
+                continue
+            axis = 0 if hi[0] - lo[0] >= hi[1] - lo[1] else 1
+            mid = (stop - start) // 2
+            part = np.argpartition(pts[:, axis], mid)
+            self.index[start:stop] = self.index[start:stop][part]
+            # 先压右半部分，左子节点先出栈，保证 left 先于 right 登记
+            pending.append((start + mid, stop, node))
+            pending.append((start, start + mid, node))
+
+    def is_leaf(self, node):
+        return self.left[node] < 0
+
+    def points(self, node):
+        return self.index[self.start[node]:self.stop[node]]
+
+    def leaves_near(self, leaf, radius_sq):
+        """
+        Leaves whose bounding box lies within squared distance `radius_sq` of the box of `leaf`.
+        Climbs from the leaf and stops once the box grown by the radius fits inside an ancestor's box.
+        """
+        x0, y0, x1, y1 = self.x0, self.y0, self.x1, self.y1
+        bx0, by0, bx1, by1 = x0[leaf], y0[leaf], x1[leaf], y1[leaf]
+        found = [leaf]
+        node = leaf
+        while node:
+            up = self.parent[node]
+            stack = [self.right[up] if self.left[up] == node else self.left[up]]
+            while stack:
+                m = stack.pop()
+                dx = x0[m] - bx1 if x0[m] > bx1 else (bx0 - x1[m] if bx0 > x1[m] else 0.0)
+                dy = y0[m] - by1 if y0[m] > by1 else (by0 - y1[m] if by0 > y1[m] else 0.0)
+                if dx * dx + dy * dy > radius_sq:
+                    continue
+                if self.left[m] < 0:
+                    found.append(m)
+                else:
+                    stack.append(self.left[m])
+                    stack.append(self.right[m])
+            node = up
+            if ((bx0 - x0[up]) ** 2 >= radius_sq and (x1[up] - bx1) ** 2 >= radius_sq and
+                    (by0 - y0[up]) ** 2 >= radius_sq and (y1[up] - by1) ** 2 >= radius_sq):
+                break
+        return found
+
+
+def nearest_neighbour_order(xy, start=(0.0, 0.0)):
+    """
+    基于KD树的最近邻构造：已访问的点从叶节点中删除，并沿父节点递减剩余计数，
+    空子树和包围盒距离不小于当前最优值的子树直接跳过；每次查询先检查上一个点所在的叶节点，
+    初始上界很紧。对均匀分布、密集簇和成排的孔都接近 O(n log n)。返回点的访问顺序（下标数组）。
+    """
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    n = len(xy)
+    if n == 0:
+        return np.empty(0, dtype=np.intp)
+
+    tree = _KDTree(xy)
+    xs, ys = xy[:, 0].tolist(), xy[:, 1].tolist()
+    left, right, parent = tree.left, tree.right, tree.parent
+    alive = [stop - start for start, stop in zip(tree.start, tree.stop)]
+    members = {}
+    leaf_of = [0] * n
+    slot = [0] * n
+    for leaf in tree.leaves:
+        bucket = tree.points(leaf).tolist()
+        members[leaf] = bucket
+        for position, idx in enumerate(bucket):
+            leaf_of[idx] = leaf
+            slot[idx] = position
+
+    def remove(idx):
+        leaf = leaf_of[idx]
+        bucket = members[leaf]
+        last = bucket.pop()
+        if last != idx:
+            bucket[slot[idx]] = last
+            slot[last] = slot[idx]
+        node = leaf
+        while node >= 0:
+            alive[node] -= 1
+            node = parent[node]
+
+    x0s, y0s, x1s, y1s = tree.x0, tree.y0, tree.x1, tree.y1
+
+    def nearest(px, py, leaf):
+        best, best_d = -1, math.inf
+        for j in members[leaf]:
+            d = (xs[j] - px) ** 2 + (ys[j] - py) ** 2
+            if d < best_d:
+                best, best_d = j, d
+        # 从当前叶节点向上逐层检查兄弟子树；以当前最优距离为半径的圆完全落在祖先包围盒内时，
+        # 包围盒外的点不可能更近，停止上溯
+        node = leaf
+        while node:
+            up = parent[node]
+            stack = [right[up] if left[up] == node else left[up]]
+            while stack:
+                m = stack.pop()
+                if not alive[m]:
+                    continue
+                dx = x0s[m] - px if px < x0s[m] else (px - x1s[m] if px > x1s[m] else 0.0)
+                dy = y0s[m] - py if py < y0s[m] else (py - y1s[m] if py > y1s[m] else 0.0)
+                if dx * dx + dy * dy >= best_d:
+                    continue
+                if left[m] < 0:
+                    for j in members[m]:
+                        d = (xs[j] - px) ** 2 + (ys[j] - py) ** 2
+                        if d < best_d:
+                            best, best_d = j, d
+                else:
+                    stack.append(right[m])
+                    stack.append(left[m])
+            node = up
+            if (best_d < math.inf and (px - x0s[up]) ** 2 >= best_d and (x1s[up] - px) ** 2 >= best_d and
+                    (py - y0s[up]) ** 2 >= best_d and (y1s[up] - py) ** 2 >= best_d):
+                break
+        return best
+
+    order = []
+    current = int(np.argmin(np.hypot(xy[:, 0] - float(start[0]), xy[:, 1] - float(start[1]))))
+    while True:
+        order.append(current)
+        remove(current)
+        if len(order) == n:
+            break
+        current = nearest(xs[current], ys[current], leaf_of[current])
+    return np.asarray(order, dtype=np.intp)
+
+
+def nearest_neighbours(xy, k=NEIGHBOUR_COUNT):
+    """
+    Returns the k nearest neighbours of every point (sorted by distance), found through the KD tree.
+    Each leaf first bounds the k-th neighbour distance from its smallest enclosing subtree with more than k points,
+    then gathers only the leaves within that bound, so the distance matrices stay leaf-sized even in dense clusters.
+    """
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    n = len(xy)
+    k = min(k, n - 1)
+    if k <= 0:
+        return [[] for _ in range(n)]
+
+    tree = _KDTree(xy, NEIGHBOUR_LEAF_SIZE)
+    result = [None] * n
+    for leaf in tree.leaves:
+        pts = tree.points(leaf)
+        node = leaf
+        while tree.stop[node] - tree.start[node] <= k:
+            node = tree.parent[node]
+        candidates = tree.points(node)
+        d = _distance_matrix(xy, pts, candidates)
+        bound = float(np.partition(d, k - 1, axis=1)[:, k - 1].max())
+        if bound > 0:
+            # bound 为 0 时（重合点）子树中的候选已是最近邻，不必再收集同一位置的所有叶节点
+            candidates = np.concatenate([tree.points(near) for near in tree.leaves_near(leaf, bound)])
+            d = _distance_matrix(xy, pts, candidates)
+        nearest = np.argpartition(d, k - 1, axis=1)[:, :k]
+        nearest_d = np.take_along_axis(d, nearest, axis=1)
+        nearest = np.take_along_axis(nearest, np.argsort(nearest_d, axis=1, kind="stable"), axis=1)
+        for p, row in zip(pts.tolist(), candidates[nearest].tolist()):
+            result[p] = row
+    return result
+
+
+def _distance_matrix(xy, pts, candidates):
+    """Squared distances between `pts` and `candidates`; a point's distance to itself is inf."""
+    d = ((xy[pts, 0][:, None] - xy[candidates, 0][None, :]) ** 2 +
+         (xy[pts, 1][:, None] - xy[candidates, 1][None, :]) ** 2)
+    d[candidates[None, :] == pts[:, None]] = np.inf
+    return d
+
+
+def improve_order(order, xy, start=(0.0, 0.0), time_budget=DEFAULT_TIME_BUDGET, neighbours=None):
+    """
+    在时间预算内用 2-opt 和 Or-opt（移动1~3个连续孔）改进开放路径。
+    起点固定，不回到起点；候选移动只在近邻列表中搜索，并用 don't-look bits 控制活动点队列。
+    """
+    deadline = time.perf_counter() + time_budget
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    n = len(order)
+    if n < 3:
+        return np.asarray(order, dtype=np.intp)
+    if neighbours is None:
+        neighbours = nearest_neighbours(xy)
+
+    # 起点作为一个固定在位置0的虚拟节点
+    origin = n
+    xs = xy[:, 0].tolist() + [float(start[0])]
+    ys = xy[:, 1].tolist() + [float(start[1])]
+    tour = [origin] + list(map(int, order))
+    size = n + 1
+    pos = [0] * size
+    for p, city in enumerate(tour):
+        pos[city] = p
+
+    def dist(a, b):
+        if a < 0 or b < 0:
+            return 0.0
+        return math.hypot(xs[a] - xs[b], ys[a] - ys[b])
+
+    def succ(a):
+        p = pos[a] + 1
+        return tour[p] if p < size else -1
+
+    def pred(a):
+        p = pos[a] - 1
+        return tour[p] if p >= 0 else -1
+
+    def reverse(i, j):
+        tour[i:j + 1] = tour[i:j + 1][::-1]
+        for p in range(i, j + 1):
+            pos[tour[p]] = p
+
+    queued = [True] * size
+    queued[origin] = False
+    active = deque(range(n))
+
+    def activate(*cities):
+        for city in cities:
+            if 0 <= city < n and not queued[city]:
+                queued[city] = True
+                active.append(city)
+
+    def try_two_opt(a):
+        i = pos[a]
+        b = succ(a)
+        if b >= 0:
+            d_ab = dist(a, b)
+            for c in neighbours[a]:
+                d_ac = dist(a, c)
+                if d_ac >= d_ab:
+                    break
+                e = succ(c)
+                if c == b or e == a:
+                    continue
+                if d_ab + dist(c, e) - d_ac - dist(b, e) > 1e-9:
+                    j = pos[c]
+                    if i < j:
+                        reverse(i + 1, j)
+                    else:
+                        reverse(j + 1, i)
+                    activate(a, b, c, e)
+                    return True
+        b = pred(a)
+        if b >= 0:
+            d_ab = dist(a, b)
+            for c in neighbours[a]:
+                d_ac = dist(a, c)
+                if d_ac >= d_ab:
+                    break
+                e = pred(c)
+                if c == b or e == a or e < 0:
+                    continue
+                if d_ab + dist(c, e) - d_ac - dist(b, e) > 1e-9:
+                    j = pos[c]
+                    if i < j:
+                        reverse(i, j - 1)
+                    else:
+                        reverse(j, i - 1)
+                    activate(a, b, c, e)
+                    return True
+        return False
+
+    def try_or_opt(a):
+        i = pos[a]
+        for length in (1, 2, 3):
+            last = i + length - 1
+            if last >= size:
+                break
+            segment = tour[i:last + 1]
+            s0, sl = segment[0], segment[-1]
+            p = tour[i - 1]
+            q = tour[last + 1] if last + 1 < size else -1
+            remove_gain = dist(p, s0) + dist(sl, q) - dist(p, q)
+            if remove_gain <= 1e-9:
+                continue
+            for c in neighbours[s0] + neighbours[sl]:
+                pc = pos[c]
+                if i <= pc <= last or c == p:
+                    continue
+                e = succ(c)
+                d_ce = dist(c, e)
+                forward = dist(c, s0) + dist(sl, e) - d_ce
+                backward = dist(c, sl) + dist(s0, e) - d_ce
+                add = min(forward, backward)
+                if remove_gain - add > 1e-9:
+                    if backward < forward:
+                        segment.reverse()
+                    del tour[i:last + 1]
+                    if pc > i:
+                        pc -= length
+                    tour[pc + 1:pc + 1] = segment
+                    lo, hi = min(i, pc + 1), min(max(last + 1, pc + 1 + length), size)
+                    for k in range(lo, hi):
+                        pos[tour[k]] = k
+                    activate(p, q, c, e, s0, sl)
+                    return True
+        return False
+
+    steps = 0
+    while active:
+        steps += 1
+        if steps & 255 == 0 and time.perf_counter() > deadline:
+            break
+        a = active.popleft()
+        queued[a] = False
+        if try_two_opt(a) or try_or_opt(a):
+            activate(a)
+    return np.asarray(tour[1:], dtype=np.intp)
+
+
+def plan_drill_path(xy, start=(0.0, 0.0), time_budget=DEFAULT_TIME_BUDGET):
+    """
+    规划钻孔顺序：KD树最近邻构造 + 限时 2-opt/Or-opt 改进。
+    返回 (order, report)，report 包含原始顺序、构造后和改进后的总空行程及各阶段耗时。
+    """
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    t0 = time.perf_counter()
+    order = nearest_neighbour_order(xy, start)
+    t1 = time.perf_counter()
+    travel_nn = path_length(xy[order], start)
+    remaining = max(0.0, time_budget - (t1 - t0))
+    improved = improve_order(order, xy, start, remaining)
+    t2 = time.perf_counter()
+
+    travel_before = path_length(xy, start)
+    travel_after = path_length(xy[improved], start)
+    report = {
+        'holes': len(xy),
+        'travel_before': round(travel_before, 3),
+        'travel_nearest_neighbour': round(travel_nn, 3),
+        'travel_after': round(travel_after, 3),
+        'reduction_percent': round(100.0 * (1 - travel_after / travel_before), 2) if travel_before else 0.0,
+        'construct_seconds': round(t1 - t0, 3),
+        'improve_seconds': round(t2 - t1, 3),
+    }
+    return improved, report
+
+
+def write_drill_gcode(out, xy, tool=1, depth=-1.5, retract=1.0, feed=300.0, title=""):
+    """
+    写出钻孔G代码：G00快速定位到第一个孔，G81固定循环钻孔，后续孔只输出模态坐标，最后G80取消循环。
+    """
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    if title:
+        out.write(f"({title})\n")
+    out.write("G90\n")
+    out.write(f"T{tool:02d}\n")
+    if len(xy):
+        x0, y0 = xy[0].tolist()
+        out.write(f"G00X{x0:.3f}Y{y0:.3f}\n")
+        out.write(f"G81X{x0:.3f}Y{y0:.3f}Z{depth:.3f}R{retract:.3f}F{feed:.0f}\n")
+        rest = xy[1:]
+        if len(rest):
+            out.write(("X%.3fY%.3f\n" * len(rest)) % tuple(rest.ravel().tolist()))
+        out.write("G80\n")
+    out.write("M30\n")
+
+
+def _usage():
+    print("Usage: python drill_path.py <adr_file> <side> [--out <file.nc>] [--time-budget <seconds>]\n"
+          "       [--start x,y] [--tool n] [--depth z] [--retract r] [--feed f]", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        _usage()
+        sys.exit(1)
+
+    adr_file, side = sys.argv[1], sys.argv[2]
+    options = dict(zip(sys.argv[3::2], sys.argv[4::2]))
+    try:
+        start = tuple(float(v) for v in options.get("--start", "0,0").split(","))
+        time_budget = float(options.get("--time-budget", DEFAULT_TIME_BUDGET))
+        pins = read_pin_table(adr_file).for_side(side)
+        order, report = plan_drill_path(pins.xy, start, time_budget)
+        report['side'] = side
+        output_path = options.get("--out")
+        if output_path:
+            ordered = pins.select(order)
+            with open(output_path, "w", newline="\n", buffering=1 << 20) as out:
+                write_drill_gcode(out, ordered.xy,
+                                  tool=int(options.get("--tool", 1)),
+                                  depth=float(options.get("--depth", -1.5)),
+                                  retract=float(options.get("--retract", 1.0)),
+                                  feed=float(options.get("--feed", 300.0)),
+                                  title=f"DRILL SIDE {side} HOLES:{len(ordered)}")
+            report['output'] = output_path
+        print(json.dumps(report))
+    except (ValueError, OSError) as e:
+        print(f"Error planning drill path: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,144 @@
+import os
+import sys
+from itertools import chain
+
+import numpy as np
+
+from json_script import load_jig_geometry, parse_alignment_args
+
+# 每批格式化的行数：整批用一次 % 运算生成字符串，再一次性写入
+CHUNK_ROWS = 65536
+WRITE_BUFFER = 1 << 20
+
+ADR_ROW = "%05d X %8.3f Y %8.3f %s  %s\n"
+CSV_PIN_ROW = "%d,%.3f,%.3f,%s,%s\n"
+CSV_OUTLINE_ROW = "%s,%d,%.4f,%.4f\n"
+DXF_POINT = "0\nPOINT\n8\n%s\n10\n%.4f\n20\n%.4f\n30\n0.0\n"
+DXF_LINE = "0\nLINE\n8\n%s\n10\n%.4f\n20\n%.4f\n30\n0.0\n11\n%.4f\n21\n%.4f\n31\n0.0\n"
+
+EXPORT_FORMATS = ("adr", "csv", "dxf")
+
+
+def _write_rows(out, row_format, columns):
+    """
+    将若干等长列按 row_format 批量格式化并写出。
+    每批把多行的值交错展平成一个元组，用重复的格式串做一次格式化，避免逐行调用 write。
+    """
+    columns = [c.tolist() if isinstance(c, np.ndarray) else list(c) for c in columns]
+    total = len(columns[0]) if columns else 0
+    for start in range(0, total, CHUNK_ROWS):
+        stop = min(start + CHUNK_ROWS, total)
+        values = tuple(chain.from_iterable(zip(*(c[start:stop] for c in columns))))
+        out.write((row_format * (stop - start)) % values)
+
+
+def _outline_segments(units):
+    """Returns the (layer, x1, y1, x2, y2) columns of all consecutive outline segments."""
+    layers, starts, ends = [], [], []
+    for filename, coords in units:
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        if len(coords) < 2:
+            continue
+        layers.append(np.full(len(coords) - 1, _layer_name(filename), dtype=object))
+        starts.append(coords[:-1])
+        ends.append(coords[1:])
+    if not starts:
+        return [], [], [], [], []
+    starts = np.concatenate(starts)
+    ends = np.concatenate(ends)
+    return np.concatenate(layers), starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1]
+
+
+def _layer_name(filename):
+    # DXF图层名不能包含空格和点
+    return "OUTLINE_" + os.path.splitext(filename)[0].replace(" ", "_").replace(".", "_")
+
+
+def write_adr(out, pin_table):
+    """Writes pins in the fixed-width ADR layout read by read_adr_file (`00001 X  -81.550 Y  149.950 A  unit1`)."""
+    _write_rows(out, ADR_ROW, (pin_table.no, pin_table.x, pin_table.y, pin_table.side, pin_table.unit))
+
+
+def write_pins_csv(out, pin_table):
+    out.write("no,x,y,side,unit\n")
+    _write_rows(out, CSV_PIN_ROW, (pin_table.no, pin_table.x, pin_table.y, pin_table.side, pin_table.unit))
+
+
+def write_outlines_csv(out, units):
+    out.write("unit,index,x,y\n")
+    for filename, coords in units:
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        _write_rows(out, CSV_OUTLINE_ROW,
+                    ([filename] * len(coords), range(len(coords)), coords[:, 0], coords[:, 1]))
+
+
+def write_dxf(out, units, pin_table=None):
+    """
+    写出最简DXF（仅ENTITIES段）：轮廓为按单元分层的LINE，引脚为PINS_A/PINS_B图层的POINT。
+    """
+    out.write("0\nSECTION\n2\nENTITIES\n")
+    segments = _outline_segments(units)
+    _write_rows(out, DXF_LINE, segments)
+    if pin_table is not None:
+        layers = np.char.add("PINS_", pin_table.side.astype(str))
+        _write_rows(out, DXF_POINT, (layers, pin_table.x, pin_table.y))
+    out.write("0\nENDSEC\n0\nEOF\n")
+
+
+def export_geometry(output_path, fmt, units, pin_table=None):
+    """
+    按格式导出处理后的几何数据：
+    adr — 只导出引脚；csv — 引脚写入 output_path，轮廓写入 `<name>_outlines.csv`；dxf — 轮廓和引脚写入同一文件。
+    返回写出的文件列表。
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    written = []
+    with open(output_path, "w", newline="\n", buffering=WRITE_BUFFER) as out:
+        if fmt == "adr":
+            if pin_table is not None:
+                write_adr(out, pin_table)
+        elif fmt == "csv":
+            if pin_table is not None:
+                write_pins_csv(out, pin_table)
+        else:
+            write_dxf(out, units, pin_table)
+    written.append(output_path)
+
+    if fmt == "csv" and units:
+        outline_path = os.path.splitext(output_path)[0] + "_outlines.csv"
+        with open(outline_path, "w", newline="\n", buffering=WRITE_BUFFER) as out:
+            write_outlines_csv(out, units)
+        written.append(outline_path)
+    return written
+
+
+def _usage():
+    print("Usage: python export_geometry.py --format adr|csv|dxf --out <path> <rut_files...> <adr_file>\n"
+          "       [--marks <TestResult.xml> --design-marks \"x1,y1;x2,y2\" [--fit similarity|affine]]",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    argv = sys.argv[1:]
+    fmt, output_path, rest = None, None, []
+    args = iter(argv)
+    for arg in args:
+        if arg == "--format":
+            fmt = next(args, None)
+        elif arg == "--out":
+            output_path = next(args, None)
+        else:
+            rest.append(arg)
+
+    positional, alignment = parse_alignment_args(rest)
+    if fmt not in EXPORT_FORMATS or not output_path or not positional:
+        _usage()
+        sys.exit(1)
+
+    rut_files = [p for p in positional if p.lower().endswith(".rut")]
+    adr_file = next((p for p in positional if p.lower().endswith(".adr")), None)
+    units, pin_table = load_jig_geometry(rut_files, adr_file, alignment)
+    for path in export_geometry(output_path, fmt, units, pin_table):
+        print(f"Exported {fmt.upper()} to {path}", file=sys.stderr)
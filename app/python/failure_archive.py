@@ -0,0 +1,217 @@
+import sys
+import json
+import sqlite3
+import datetime
+import numpy as np
+
+DEFAULT_KEEP_MONTHS = 3
+
+# 归档表：日志名和错误类型字典编码；每个 (月份, 日志, 错误类型) 一行，引脚编号排序后差分并按最小整数宽度打包
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive_logs (
+  id INTEGER PRIMARY KEY,
+  name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS archive_error_types (
+  id INTEGER PRIMARY KEY,
+  name TEXT UNIQUE
+);
+CREATE TABLE IF NOT EXISTS archive_chunks (
+  month TEXT NOT NULL,
+  log_id INTEGER NOT NULL REFERENCES archive_logs(id),
+  error_type_id INTEGER NOT NULL REFERENCES archive_error_types(id),
+  row_count INTEGER NOT NULL,
+  base_pin INTEGER NOT NULL,
+  pin_width INTEGER NOT NULL,
+  pins BLOB NOT NULL,
+  first_timestamp TEXT,
+  last_timestamp TEXT,
+  PRIMARY KEY (month, log_id, error_type_id)
+);
+"""
+
+_WIDTHS = ((1, np.uint8), (2, np.uint16), (4, np.uint32), (8, np.uint64))
+
+
+def pack_pins(pins):
+    """
+    Packs pin numbers as (base_pin, width, bytes): sorted, delta-encoded from the smallest pin,
+    stored with the narrowest unsigned integer type that fits the largest delta. Duplicates are kept.
+    """
+    pins = np.sort(np.asarray(pins, dtype=np.int64))
+    if len(pins) == 0:
+        return 0, 1, b""
+    deltas = np.diff(pins, prepend=pins[0])
+    largest = int(deltas.max())
+    for width, dtype in _WIDTHS:
+        if largest <= np.iinfo(dtype).max:
+            return int(pins[0]), width, deltas.astype(dtype).tobytes()
+    raise ValueError("Pin delta out of range")
+
+
+def unpack_pins(base_pin, width, data):
+    dtype = dict(_WIDTHS)[width]
+    deltas = np.frombuffer(data, dtype=dtype).astype(np.int64)
+    return np.cumsum(deltas) + base_pin
+
+
+def ensure_archive(connection):
+    connection.executescript(ARCHIVE_SCHEMA)
+
+
+def month_cutoff(keep_months, today=None):
+    """First day (`YYYY-MM-01`) of the oldest month that stays in the live table."""
+    today = today or datetime.date.today()
+    months = today.year * 12 + today.month - 1 - keep_months
+    return f"{months // 12:04d}-{months % 12 + 1:02d}-01"
+
+
+def _dictionary_id(connection, table, name):
+    row = connection.execute(f"SELECT id FROM {table} WHERE name IS ?", (name,)).fetchone()
+    if row:
+        return row[0]
+    return connection.execute(f"INSERT INTO {table} (name) VALUES (?)", (name,)).lastrowid
+
+
+def compact(db_path, keep_months=DEFAULT_KEEP_MONTHS, vacuum=True, today=None):
+    """
+    把早于最近 keep_months 个自然月的失败记录移入按月分区的归档表，并在完成后 VACUUM 回收空间。
+    迁移和删除在同一事务中完成，中途失败不会丢失或重复记录。返回每个月份迁移的行数。
+    """
+    cutoff = month_cutoff(keep_months, today)
+    connection = sqlite3.connect(db_path)
+    moved = {}
+    try:
+        ensure_archive(connection)
+        with connection:
+            groups = {}
+            rows = connection.execute(
+                "SELECT strftime('%Y-%m', timestamp), log_file, error_type, pin_number, timestamp "
+                "FROM failures WHERE timestamp < ?", (cutoff,))
+            for month, log_file, error_type, pin, timestamp in rows:
+                group = groups.setdefault((month, log_file, error_type), {'pins': [], 'first': timestamp,
+                                                                          'last': timestamp})
+                group['pins'].append(pin)
+                group['first'] = min(group['first'], timestamp)
+                group['last'] = max(group['last'], timestamp)
+
+            for (month, log_file, error_type), group in groups.items():
+                log_id = _dictionary_id(connection, "archive_logs", log_file)
+                type_id = _dictionary_id(connection, "archive_error_types", error_type)
+                pins = group['pins']
+                existing = connection.execute(
+                    "SELECT base_pin, pin_width, pins, first_timestamp, last_timestamp FROM archive_chunks "
+                    "WHERE month = ? AND log_id = ? AND error_type_id = ?", (month, log_id, type_id)).fetchone()
+                if existing:
+                    # 同一日志在该月已有归档（例如重新导入），合并后重新打包
+                    pins = np.concatenate((unpack_pins(*existing[:3]), pins))
+                    group['first'] = min(group['first'], existing[3])
+                    group['last'] = max(group['last'], existing[4])
+                base_pin, width, data = pack_pins(pins)
+                connection.execute(
+                    "INSERT OR REPLACE INTO archive_chunks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (month, log_id, type_id, len(pins), base_pin, width, data, group['first'], group['last']))
+                moved[month] = moved.get(month, 0) + len(group['pins'])
+
+            connection.execute("DELETE FROM failures WHERE timestamp < ?", (cutoff,))
+        if vacuum:
+            connection.execute("VACUUM")
+    finally:
+        connection.close()
+    return moved
+
+
+def iter_failures(db_path, pin_numbers=None, log_files=None, error_types=None, since=None, until=None):
+    """
+    跨实时表和归档统一查询失败记录，逐条生成 (pin_number, error_type, log_file, month)。
+    since/until 为 `YYYY-MM` 月份（含）；其余过滤条件为集合或列表。归档记录的时间精度为月。
+    """
+    # (实时表表达式, 归档表达式, 参数)
+    filters = []
+    if log_files is not None:
+        filters.append(("log_file", "l.name", list(log_files)))
+    if error_types is not None:
+        filters.append(("error_type", "t.name", list(error_types)))
+
+    def where(column_index, month_column):
+        clauses, params = [], []
+        for columns in filters:
+            clauses.append(f"{columns[column_index]} IN ({','.join('?' * len(columns[2]))})")
+            params.extend(columns[2])
+        if since:
+            clauses.append(f"{month_column} >= ?")
+            params.append(since)
+        if until:
+            clauses.append(f"{month_column} <= ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    pin_filter = np.unique(np.asarray(list(pin_numbers), dtype=np.int64)) if pin_numbers is not None else None
+    pin_set = set(pin_filter.tolist()) if pin_filter is not None else None
+    connection = sqlite3.connect(db_path)
+    try:
+        clause, params = where(0, "strftime('%Y-%m', timestamp)")
+        rows = connection.execute(
+            "SELECT pin_number, error_type, log_file, strftime('%Y-%m', timestamp) FROM failures" + clause, params)
+        for row in rows:
+            if pin_set is None or row[0] in pin_set:
+                yield row
+
+        if not connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'archive_chunks'").fetchone():
+            return
+        clause, params = where(1, "c.month")
+        chunks = connection.execute(
+            "SELECT l.name, t.name, c.month, c.base_pin, c.pin_width, c.pins FROM archive_chunks c "
+            "JOIN archive_logs l ON l.id = c.log_id JOIN archive_error_types t ON t.id = c.error_type_id"
+            + clause, params)
+        for log_file, error_type, month, base_pin, width, data in chunks:
+            pins = unpack_pins(base_pin, width, data)
+            if pin_filter is not None:
+                pins = pins[np.isin(pins, pin_filter)]
+            for pin in pins.tolist():
+                yield pin, error_type, log_file, month
+    finally:
+        connection.close()
+
+
+def archive_stats(db_path):
+    """Row counts of the live table and of each archived month, plus the database file size."""
+    connection = sqlite3.connect(db_path)
+    try:
+        live = connection.execute("SELECT COUNT(*) FROM failures").fetchone()[0]
+        months = {}
+        if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'archive_chunks'").fetchone():
+            months = dict(connection.execute(
+                "SELECT month, SUM(row_count) FROM archive_chunks GROUP BY month ORDER BY month"))
+        page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+        page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        connection.close()
+    return {'live_rows': live, 'archived_rows': sum(months.values()), 'archived_months': months,
+            'db_bytes': page_count * page_size}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("compact", "stats", "query"):
+        print("Usage: python failure_archive.py compact <jig_data.db> [--keep-months 3] [--no-vacuum]", file=sys.stderr)
+        print("       python failure_archive.py stats <jig_data.db>", file=sys.stderr)
+        print("       python failure_archive.py query <jig_data.db> [--pins 1,2] [--logs a.csv] [--types OPEN] "
+              "[--since 2025-01] [--until 2025-06]", file=sys.stderr)
+        sys.exit(1)
+
+    command, db_path = sys.argv[1], sys.argv[2]
+    args = [arg for arg in sys.argv[3:] if arg != "--no-vacuum"]
+    options = dict(zip(args[::2], args[1::2]))
+    if command == "compact":
+        moved = compact(db_path, int(options.get("--keep-months", DEFAULT_KEEP_MONTHS)),
+                        vacuum="--no-vacuum" not in sys.argv)
+        print(json.dumps({'moved': moved, **archive_stats(db_path)}))
+    elif command == "stats":
+        print(json.dumps(archive_stats(db_path)))
+    else:
+        def split(name, cast=str):
+            return [cast(v) for v in options[name].split(",")] if options.get(name) else None
+        rows = iter_failures(db_path, split("--pins", int), split("--logs"), split("--types"),
+                             options.get("--since"), options.get("--until"))
+        print(json.dumps([{'pin': pin, 'error_type': error_type, 'log_file': log_file, 'month': month}
+                          for pin, error_type, log_file, month in rows]))
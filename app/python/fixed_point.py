@@ -0,0 +1,114 @@
+from fractions import Fraction
+import numpy as np
+
+# 内部定点坐标：1 单位 = 1 微米。RUT/ADR 坐标均为3位小数（mm），量化是精确的
+UM_PER_MM = 1000
+# 坐标绝对值上限（约1073 m）：差值小于 2**31，叉积小于 2**62，int64 运算不会溢出
+MAX_UM = 2 ** 30 - 1
+
+
+def to_um(values, dtype=np.int32):
+    """Quantizes millimetre coordinates to integer micrometres; raises ValueError when out of range."""
+    values = np.asarray(values, dtype=np.float64)
+    if not np.isfinite(values).all():
+        raise ValueError("Coordinates must be finite")
+    quantized = np.rint(values * UM_PER_MM)
+    if quantized.size and np.abs(quantized).max() > MAX_UM:
+        raise ValueError("Coordinate out of fixed-point range")
+    return quantized.astype(dtype)
+
+
+def to_mm(quantized):
+    return np.asarray(quantized, dtype=np.float64) / UM_PER_MM
+
+
+def point_um(point):
+    """Single (x, y) in mm -> (x, y) as Python ints in micrometres."""
+    return int(round(point[0] * UM_PER_MM)), int(round(point[1] * UM_PER_MM))
+
+
+def same_point(a, b):
+    """Exact comparison of two mm points on the micrometre grid."""
+    return point_um(a) == point_um(b)
+
+
+def point_keys(quantized):
+    """
+    Packs (N, 2) integer coordinates into one int64 key per point (x in the high 32 bits),
+    so exact equality and hashing of points reduce to integer operations.
+    """
+    quantized = np.asarray(quantized, dtype=np.int64).reshape(-1, 2)
+    return (quantized[:, 0] << 32) | (quantized[:, 1] & 0xFFFFFFFF)
+
+
+def dedupe_points(quantized):
+    """
+    精确去重：返回 (unique_points, first_index, inverse, counts)，
+    unique_points 按键排序，inverse 把每个输入点映射到其唯一点。
+    """
+    quantized = np.asarray(quantized).reshape(-1, 2)
+    _, first, inverse, counts = np.unique(point_keys(quantized), return_index=True,
+                                          return_inverse=True, return_counts=True)
+    return quantized[first], first, inverse.ravel(), counts
+
+
+def orientation(a, b, c):
+    """
+    Exact orientation of c relative to the directed line a->b for integer coordinates:
+    1 counter-clockwise, -1 clockwise, 0 collinear. Works on single points or (N, 2) arrays.
+    """
+    a, b, c = (np.asarray(p, dtype=np.int64) for p in (a, b, c))
+    cross = (b[..., 0] - a[..., 0]) * (c[..., 1] - a[..., 1]) - (b[..., 1] - a[..., 1]) * (c[..., 0] - a[..., 0])
+    return np.sign(cross)
+
+
+def cross(o, a, b):
+    """Exact scalar cross product (a - o) x (b - o) for Python ints or Fractions; the sign gives the orientation."""
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+
+def _on_segment(p, q, r):
+    """For collinear p, q, r: whether r lies within the bounding box of segment pq."""
+    return ((np.minimum(p[..., 0], q[..., 0]) <= r[..., 0]) & (r[..., 0] <= np.maximum(p[..., 0], q[..., 0])) &
+            (np.minimum(p[..., 1], q[..., 1]) <= r[..., 1]) & (r[..., 1] <= np.maximum(p[..., 1], q[..., 1])))
+
+
+def segments_intersect(p1, p2, q1, q2):
+    """Exact test whether segments p1p2 and q1q2 share at least one point (touching counts)."""
+    p1, p2, q1, q2 = (np.asarray(p, dtype=np.int64) for p in (p1, p2, q1, q2))
+    o1, o2 = orientation(p1, p2, q1), orientation(p1, p2, q2)
+    o3, o4 = orientation(q1, q2, p1), orientation(q1, q2, p2)
+    proper = (o1 != o2) & (o3 != o4)
+    touching = (((o1 == 0) & _on_segment(p1, p2, q1)) | ((o2 == 0) & _on_segment(p1, p2, q2)) |
+                ((o3 == 0) & _on_segment(q1, q2, p1)) | ((o4 == 0) & _on_segment(q1, q2, p2)))
+    return proper | touching
+
+
+def line_intersection(p1, p2, q1, q2):
+    """
+    两条线段所在直线交点的精确有理数解（微米整数输入，返回 Fraction 坐标）。
+    平行或重合时抛出 ValueError("Parallel lines")；交点不在两条线段上时抛出 ValueError("Intersection not on segments")。
+    """
+    (x1, y1), (x2, y2), (x3, y3), (x4, y4) = (tuple(int(v) for v in p) for p in (p1, p2, q1, q2))
+    rx, ry = x2 - x1, y2 - y1
+    sx, sy = x4 - x3, y4 - y3
+    denom = rx * sy - ry * sx
+    if denom == 0:
+        raise ValueError("Parallel lines")
+    t = Fraction((x3 - x1) * sy - (y3 - y1) * sx, denom)
+    u = Fraction((x3 - x1) * ry - (y3 - y1) * rx, denom)
+    if not (0 <= t <= 1 and 0 <= u <= 1):
+        raise ValueError("Intersection not on segments")
+    return x1 + t * rx, y1 + t * ry
+
+
+def intersection_point_mm(p1, p2, q1, q2):
+    """line_intersection for millimetre inputs; the exact result is rounded once to float mm."""
+    x, y = line_intersection(*(point_um(p) for p in (p1, p2, q1, q2)))
+    return float(x / UM_PER_MM), float(y / UM_PER_MM)
+
+
+def intersection_point_um(p1, p2, q1, q2):
+    """line_intersection rounded once to the nearest micrometre, as a point of Python ints."""
+    x, y = line_intersection(p1, p2, q1, q2)
+    return round(x), round(y)
@@ -0,0 +1,167 @@
+import os
+import sys
+import json
+import time
+import numpy as np
+
+from json_script import load_jig_geometry, build_output, parse_alignment_args
+
+DEFAULT_INTERVAL = 0.5
+
+
+def file_signature(path):
+    """(mtime_ns, size) of a file, or None when it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _occurrence_keys(numbers):
+    """
+    Unique keys for pin numbers that may repeat: the k-th occurrence of number n gets (n, k),
+    packed into one int64 so that set operations stay vectorized.
+    """
+    order = np.argsort(numbers, kind="stable")
+    sorted_numbers = numbers[order]
+    starts = np.ones(len(numbers), dtype=bool)
+    starts[1:] = sorted_numbers[1:] != sorted_numbers[:-1]
+    group_start = np.maximum.accumulate(np.where(starts, np.arange(len(numbers)), 0))
+    occurrence = np.empty(len(numbers), dtype=np.int64)
+    occurrence[order] = np.arange(len(numbers)) - group_start
+    return numbers.astype(np.int64) * (1 << 20) + occurrence
+
+
+def diff_pin_tables(old, new):
+    """
+    比较两份引脚表（按面、按引脚编号，重复编号按出现顺序配对），返回
+    {'side_a': {'added': [...], 'removed': [...], 'moved': [...]}, 'side_b': {...}}，
+    记录格式与 adr_data 相同（{'no', 'x', 'y'}）。移动按整数微米坐标精确判断。
+    """
+    delta = {}
+    for side, key in (("A", "side_a"), ("B", "side_b")):
+        before = old.for_side(side) if old is not None else None
+        after = new.for_side(side) if new is not None else None
+        if before is None or len(before) == 0:
+            delta[key] = {'added': after.to_records() if after is not None else [], 'removed': [], 'moved': []}
+            continue
+        if after is None or len(after) == 0:
+            delta[key] = {'added': [], 'removed': before.to_records(), 'moved': []}
+            continue
+
+        old_keys, new_keys = _occurrence_keys(before.no), _occurrence_keys(after.no)
+        _, old_common, new_common = np.intersect1d(old_keys, new_keys, assume_unique=True, return_indices=True)
+        removed = np.ones(len(before), dtype=bool)
+        removed[old_common] = False
+        added = np.ones(len(after), dtype=bool)
+        added[new_common] = False
+        shifted = (after.xy_um[new_common] != before.xy_um[old_common]).any(axis=1)
+        moved = np.sort(new_common[shifted])
+        delta[key] = {'added': after.select(added).to_records(),
+                      'removed': before.select(removed).to_records(),
+                      'moved': after.select(moved).to_records()}
+    return delta
+
+
+class JigWatcher:
+    """
+    轮询监视已加载的RUT和ADR文件（mtime与大小），只重新解析发生变化的文件，
+    并生成增量消息而不是完整数据。文件签名在连续两次轮询中不变后才解析，避免读到写了一半的文件。
+    """
+
+    def __init__(self, rut_files, adr_file, alignment=None):
+        self.rut_files = list(rut_files)
+        self.adr_file = adr_file
+        self.alignment = alignment
+        self.units = {}
+        self.pin_table = None
+        self.signatures = {}
+        self.pending = {}
+
+    def snapshot(self):
+        """Loads every file once and returns the full `snapshot` message."""
+        units, pin_table = load_jig_geometry(self.rut_files, self.adr_file, self.alignment)
+        self.units = {filename: coords for filename, coords in units}
+        self.pin_table = pin_table
+        for path in self.watched_paths():
+            self.signatures[path] = file_signature(path)
+        return {'type': 'snapshot', 'data': build_output(units, pin_table, self.adr_file)}
+
+    def watched_paths(self):
+        return self.rut_files + ([self.adr_file] if self.adr_file else [])
+
+    def changed_paths(self):
+        """Paths whose signature changed and has since stayed stable for one polling interval."""
+        ready = []
+        for path in self.watched_paths():
+            signature = file_signature(path)
+            if signature == self.signatures.get(path):
+                self.pending.pop(path, None)
+                continue
+            if self.pending.get(path, 0) == signature:
+                del self.pending[path]
+                self.signatures[path] = signature
+                ready.append(path)
+            else:
+                self.pending[path] = signature
+        return ready
+
+    def reload_rut(self, path):
+        filename = os.path.basename(path)
+        if file_signature(path) is None:
+            self.units.pop(filename, None)
+            return {'type': 'outline_removed', 'filename': filename}
+        units, _ = load_jig_geometry([path], None, self.alignment)
+        if not units:
+            return None
+        coords = units[0][1]
+        self.units[filename] = coords
+        return {'type': 'outline', 'filename': filename, 'coords': [tuple(p) for p in coords.tolist()]}
+
+    def reload_adr(self):
+        _, pin_table = load_jig_geometry([], self.adr_file, self.alignment)
+        delta = diff_pin_tables(self.pin_table, pin_table)
+        self.pin_table = pin_table
+        counts = {key: {change: len(records) for change, records in side.items()} for key, side in delta.items()}
+        return {'type': 'pins', 'counts': counts, **delta}
+
+    def poll(self):
+        """Checks the files once and returns the delta messages for those that changed."""
+        messages = []
+        for path in self.changed_paths():
+            began = time.perf_counter()
+            message = self.reload_adr() if path == self.adr_file else self.reload_rut(path)
+            if message is not None:
+                message['seconds'] = round(time.perf_counter() - began, 3)
+                messages.append(message)
+        return messages
+
+    def run(self, interval=DEFAULT_INTERVAL, emit=None):
+        """
+        输出初始快照后持续轮询，每条消息一行JSON（NDJSON）写到stdout。
+        """
+        emit = emit or (lambda message: print(json.dumps(message), flush=True))
+        emit(self.snapshot())
+        while True:
+            time.sleep(interval)
+            for message in self.poll():
+                emit(message)
+
+
+if __name__ == "__main__":
+    args, alignment = parse_alignment_args(sys.argv[1:])
+    interval = DEFAULT_INTERVAL
+    if "--interval" in args:
+        position = args.index("--interval")
+        interval = float(args[position + 1])
+        del args[position:position + 2]
+    if len(args) < 2:
+        print("Usage: python jig_watch.py <rut_files...> <adr_file> [--interval 0.5] "
+              "[--marks xml --design-marks \"x1,y1;x2,y2\"]", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        JigWatcher(args[:-1], args[-1], alignment).run(interval)
+    except KeyboardInterrupt:
+        pass
@@ -2,10 +2,26 @@ import os
 import re
 import json
 import sys
+import multiprocessing
+import numpy as np
+
+import transform
+import fixed_point
+from adr_sharded import read_pin_table_sharded
+from svg_payload import build_svg_payload
 
 def process_jig_unit(raw_coords, x_offset, y_offset, jig_name=""):
     """
     (最终版) 精确处理治具单元，实现“切角”逻辑以消除“小三角”。
+    毫米坐标接口：内部在整数微米网格上由 process_jig_unit_um 完成，结果再换算回毫米并减去偏移量。
+    """
+    processed = process_jig_unit_um([fixed_point.point_um(p) for p in raw_coords or []])
+    return [(x / fixed_point.UM_PER_MM - x_offset, y / fixed_point.UM_PER_MM - y_offset) for x, y in processed]
+
+def process_jig_unit_um(raw_coords):
+    """
+    切角逻辑的整数微米版本：raw_coords 为 (x, y) 整数点列表，返回新的整数点列表。
+    交点由精确有理数求出后取整到最近的微米（RUT坐标本身的分辨率）。
     """
     # 1. 安全检查：至少需要4个点才能定义两条线段
     if not raw_coords or len(raw_coords) < 4:
@@ -14,29 +30,26 @@ def process_jig_unit(raw_coords, x_offset, y_offset, jig_name=""):
             processed = raw_coords[:]
             if processed[-1] != processed[0]:
                 processed.append(processed[0])
-            return [(x - x_offset, y - y_offset) for x, y in processed]
+            return processed
         return []
 
-    processed_coords = []
     try:
         # 2. 尝试计算起始线段和结束线段的交点
-        intersection = calculate_intersection_point(
+        intersection = fixed_point.intersection_point_um(
             raw_coords[0], raw_coords[1],
             raw_coords[-2], raw_coords[-1]
         )
 
         # 3. 核心逻辑：重组坐标列表以实现“切角”
         # 新的路径是 [交点, P2, P3, ..., Pn-1, 交点]
-        processed_coords = [intersection] + raw_coords[1:-1] + [intersection]
+        return [intersection] + raw_coords[1:-1] + [intersection]
 
     except ValueError:
         # 4. 如果交点计算失败（例如，线段平行），则退回简单的闭合逻辑
         processed_coords = raw_coords[:]
         if processed_coords[-1] != processed_coords[0]:
             processed_coords.append(processed_coords[0])
-
-    # 5. 应用偏移量，返回最终坐标
-    return [(x - x_offset, y - y_offset) for x, y in processed_coords]
+        return processed_coords
 
 def read_rut_file_for_offset(file_path):
     x_offset, y_offset = 0.0, 0.0
@@ -67,40 +80,11 @@ def extract_coordinates(file_path):
     return coordinates
 
 def calculate_intersection_point(coord1, coord2, coord3, coord4):
-    try:
-        k1 = (coord2[1] - coord1[1]) / (coord2[0] - coord1[0])
-    except ZeroDivisionError:
-        k1 = float("inf")
-    b1 = coord1[1] - k1 * coord1[0] if k1 != float("inf") else None
-
-    try:
-        k2 = (coord4[1] - coord3[1]) / (coord4[0] - coord3[0])
-    except ZeroDivisionError:
-        k2 = float("inf")
-    b2 = coord3[1] - k2 * coord3[0] if k2 != float("inf") else None
-
-    if k1 == k2:
-        raise ValueError("Parallel lines")
-    elif k1 == float("inf"):
-        x_intersection = coord1[0]
-        y_intersection = k2 * x_intersection + b2
-    elif k2 == float("inf"):
-        x_intersection = coord3[0]
-        y_intersection = k1 * x_intersection + b1
-    else:
-        x_intersection = (b2 - b1) / (k1 - k2)
-        y_intersection = k1 * x_intersection + b1
-
-    def is_between(a, b, c):
-        return min(a, b) <= c <= max(a, b)
-
-    if (is_between(coord1[0], coord2[0], x_intersection) and
-            is_between(coord1[1], coord2[1], y_intersection) and
-            is_between(coord3[0], coord4[0], x_intersection) and
-            is_between(coord3[1], coord4[1], y_intersection)):
-        return x_intersection, y_intersection
-    else:
-        raise ValueError("Intersection not on segments")
+    """
+    线段 coord1-coord2 与 coord3-coord4 的交点。坐标先量化为整数微米，
+    平行判断和“交点在线段上”的判断都是精确的整数/有理数运算，不再比较浮点斜率。
+    """
+    return fixed_point.intersection_point_mm(coord1, coord2, coord3, coord4)
 
 class PinPoint:
     def __init__(self, no, x, y, side):
@@ -137,54 +121,138 @@ def read_adr_file(file_path):
         print(f"ERROR reading ADR file: {str(e)}", file=sys.stderr)
         raise
 
-def main(rut_files, adr_file):
+def build_unit_transform(file_path, x_offset, y_offset, alignment=None):
+    """
+    组合单个RUT单元的变换：TOP面镜像 -> 减去偏移量 -> （可选）基准标记对齐。
+    """
+    steps = []
+    # Assuming file names can distinguish between up and down to apply transformation
+    is_top = "TOP" in os.path.basename(file_path).upper()
+    if is_top:
+        steps.append(transform.mirror_x())
+    steps.append(transform.translation(-x_offset, -y_offset))
+    if alignment:
+        fixture = "top" if is_top else "bottom"
+        if fixture in alignment:
+            steps.append(alignment[fixture])
+    return transform.compose(*steps)
+
+def load_jig_geometry(rut_files, adr_file, alignment=None, adr_workers=None):
+    """
+    读取并处理RUT轮廓和ADR引脚，返回 (units, pin_table)。
+    units 为 [(filename, (N, 2) 坐标数组)]；ADR未提供或读取失败时 pin_table 为 None。
+    `alignment` 为 transform.alignment_from_marks 的结果（{'top': 3x3, 'bottom': 3x3}），
+    提供时RUT轮廓和ADR引脚会按对应治具的基准标记对齐。
+    `adr_workers` 为ADR分片解析的进程数，默认使用全部CPU。
+    """
+    # 所有轮廓顶点和引脚拼接成一个数组，每个点记录所用变换的下标，
+    # 镜像、偏移和对齐在最后一次性向量化完成
+    matrices = []
+    chunks = []
+    chunk_index = []
+
+    # 处理RUT文件
+    rut_entries = []
+    for file_path in rut_files:
+        try:
+            print(f"Processing RUT file: {file_path}", file=sys.stderr)
+            x_offset, y_offset = read_rut_file_for_offset(file_path)
+            coordinates = extract_coordinates(file_path)
+
+            # 切角在原始坐标（整数微米）中完成（仿射变换保持交点），偏移量由统一变换处理
+            vertices = fixed_point.to_um(np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)).tolist()
+            processed_coords = process_jig_unit_um([tuple(p) for p in vertices])
+            matrices.append(build_unit_transform(file_path, x_offset, y_offset, alignment))
+            chunks.append(np.asarray(processed_coords, dtype=np.int32).reshape(-1, 2))
+            chunk_index.append(len(matrices) - 1)
+            rut_entries.append(os.path.basename(file_path))
+            print(f"Successfully processed RUT file: {file_path}", file=sys.stderr)
+        except Exception as e:
+            print(f"Error processing RUT file {file_path}: {str(e)}", file=sys.stderr)
+            # 继续处理其他RUT文件
+
+    # 处理ADR文件
+    pin_table = None
+    if adr_file:
+        try:
+            print(f"Processing ADR file: {adr_file}", file=sys.stderr)
+            # 检查文件是否存在
+            if not os.path.exists(adr_file):
+                print(f"ADR file does not exist: {adr_file}", file=sys.stderr)
+                # 尝试在当前目录查找同名文件
+                base_name = os.path.basename(adr_file)
+                if os.path.exists(base_name):
+                    print(f"Found ADR file in current directory: {base_name}", file=sys.stderr)
+                    adr_file = base_name
+
+            # 大文件自动多进程分片解析，小文件仍为单进程
+            pin_table = read_pin_table_sharded(adr_file, adr_workers)
+            pin_table = pin_table.select((pin_table.side == "A") | (pin_table.side == "B"))
+            side_matrix = {}
+            for side, fixture in transform.SIDE_FIXTURE.items():
+                matrices.append(alignment[fixture] if alignment and fixture in alignment else transform.identity())
+                side_matrix[side] = len(matrices) - 1
+            pin_index = np.where(pin_table.side == "A", side_matrix["A"], side_matrix["B"])
+            print(f"Successfully processed ADR file with {len(pin_table)} pins", file=sys.stderr)
+        except Exception as e:
+            print(f"Error processing ADR file: {str(e)}", file=sys.stderr)
+            pin_table = None
+
+    # 统一变换所有轮廓顶点和引脚
+    lengths = [len(chunk) for chunk in chunks]
+    index = np.repeat(np.asarray(chunk_index, dtype=np.intp), lengths)
+    xy_um = np.concatenate(chunks) if chunks else np.empty((0, 2), dtype=np.int32)
+    if pin_table is not None:
+        index = np.concatenate((index, pin_index))
+        xy_um = np.concatenate((xy_um, pin_table.xy_um))
+    # 轮廓和引脚在变换前都是整数微米，变换（镜像、偏移、对齐）在毫米浮点中进行
+    xy = fixed_point.to_mm(xy_um)
+    transformed = transform.apply_transforms(matrices, index, xy) if len(xy) else xy
+
+    units = []
+    start = 0
+    for filename, length in zip(rut_entries, lengths):
+        units.append((filename, transformed[start:start + length]))
+        start += length
+
+    if pin_table is not None:
+        pin_table = pin_table.with_xy(transformed[start:])
+    return units, pin_table
+
+def build_output(units, pin_table, adr_file):
+    """Builds the `{'rut_data', 'adr_data'}` structure sent to the renderer."""
+    all_data = {'rut_data': [], 'adr_data': {}}
+    for filename, coords in units:
+        all_data['rut_data'].append({'filename': filename, 'coords': [tuple(p) for p in coords.tolist()]})
+
+    if pin_table is not None:
+        all_data['adr_data'] = {'side_a': pin_table.for_side("A").to_records(),
+                                'side_b': pin_table.for_side("B").to_records()}
+    elif adr_file:
+        # 创建空的ADR数据结构
+        all_data['adr_data'] = {'side_a': [], 'side_b': []}
+    return all_data
+
+def main(rut_files, adr_file, alignment=None, svg=False, cut_edge=False):
+    """
+    `svg` 为 True 时额外输出 build_svg_payload 生成的紧凑SVG路径（all_data['svg']）；
+    `cut_edge` 为 True 时额外输出按刀具半径补偿后的实际切削边（all_data['cut_data']）。
+    """
     try:
         print(f"Starting json_script.py with RUT files: {rut_files}", file=sys.stderr)
         print(f"ADR file: {adr_file}", file=sys.stderr)
         print(f"Current working directory: {os.getcwd()}", file=sys.stderr)
         
-        all_data = {'rut_data': [], 'adr_data': {}}
-
-        # 处理RUT文件
-        for file_path in rut_files:
-            try:
-                print(f"Processing RUT file: {file_path}", file=sys.stderr)
-                x_offset, y_offset = read_rut_file_for_offset(file_path)
-                coordinates = extract_coordinates(file_path)
-                
-                # Assuming file names can distinguish between up and down to apply transformation
-                if "TOP" in os.path.basename(file_path).upper():
-                    coordinates = [(-x, y) for x, y in coordinates]
-
-                processed_coords = process_jig_unit(coordinates, x_offset, y_offset)
-                all_data['rut_data'].append({'filename': os.path.basename(file_path), 'coords': processed_coords})
-                print(f"Successfully processed RUT file: {file_path}", file=sys.stderr)
-            except Exception as e:
-                print(f"Error processing RUT file {file_path}: {str(e)}", file=sys.stderr)
-                # 继续处理其他RUT文件
-
-        # 处理ADR文件
-        if adr_file:
-            try:
-                print(f"Processing ADR file: {adr_file}", file=sys.stderr)
-                # 检查文件是否存在
-                if not os.path.exists(adr_file):
-                    print(f"ADR file does not exist: {adr_file}", file=sys.stderr)
-                    # 尝试在当前目录查找同名文件
-                    base_name = os.path.basename(adr_file)
-                    if os.path.exists(base_name):
-                        print(f"Found ADR file in current directory: {base_name}", file=sys.stderr)
-                        adr_file = base_name
-                
-                pin_list = read_adr_file(adr_file)
-                pin_list_a = [{'no': pin.no, 'x': pin.x, 'y': pin.y} for pin in pin_list if pin.side == "A"]
-                pin_list_b = [{'no': pin.no, 'x': pin.x, 'y': pin.y} for pin in pin_list if pin.side == "B"]
-                all_data['adr_data'] = {'side_a': pin_list_a, 'side_b': pin_list_b}
-                print(f"Successfully processed ADR file with {len(pin_list)} pins", file=sys.stderr)
-            except Exception as e:
-                print(f"Error processing ADR file: {str(e)}", file=sys.stderr)
-                # 创建空的ADR数据结构
-                all_data['adr_data'] = {'side_a': [], 'side_b': []}
+        units, pin_table = load_jig_geometry(rut_files, adr_file, alignment)
+        all_data = build_output(units, pin_table, adr_file)
+
+        if svg:
+            all_data['svg'] = build_svg_payload(units, pin_table)
+
+        if cut_edge:
+            # cutter_compensation 依赖本模块，延迟导入
+            from cutter_compensation import load_cut_edges
+            all_data['cut_data'] = load_cut_edges(rut_files, alignment)
 
         # 输出JSON结果
         print(json.dumps(all_data))
@@ -195,7 +263,37 @@ def main(rut_files, adr_file):
         print(json.dumps({'rut_data': [], 'adr_data': {'side_a': [], 'side_b': []}}))
         sys.exit(1)
 
+def parse_alignment_args(argv):
+    """
+    从命令行参数中取出可选的对齐参数：
+    --marks <TestResult.xml> --design-marks "x1,y1;x2,y2" [--fit similarity|affine]
+    返回 (剩余位置参数, alignment)。
+    """
+    options = {}
+    positional = []
+    args = iter(argv)
+    for arg in args:
+        if arg in ("--marks", "--design-marks", "--fit"):
+            options[arg] = next(args, None)
+        else:
+            positional.append(arg)
+
+    alignment = None
+    if options.get("--marks"):
+        if not options.get("--design-marks"):
+            print("Warning: --marks given without --design-marks, skipping alignment", file=sys.stderr)
+        else:
+            measured = transform.read_correction_marks(options["--marks"])
+            design = transform.parse_mark_list(options["--design-marks"])
+            alignment = transform.alignment_from_marks(design, measured, options.get("--fit") or "similarity")
+    return positional, alignment
+
 if __name__ == "__main__":
-    rut_files = sys.argv[1:-1]
-    adr_file = sys.argv[-1]
-    main(rut_files, adr_file)
+    # PyInstaller打包后多进程需要此调用
+    multiprocessing.freeze_support()
+    svg = "--svg" in sys.argv
+    cut_edge = "--cut-edge" in sys.argv
+    args, alignment = parse_alignment_args([arg for arg in sys.argv[1:] if arg not in ("--svg", "--cut-edge")])
+    rut_files = args[:-1]
+    adr_file = args[-1]
+    main(rut_files, adr_file, alignment, svg, cut_edge)
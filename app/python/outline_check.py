@@ -0,0 +1,238 @@
+import os
+import sys
+import json
+import heapq
+import math
+from fractions import Fraction
+
+import numpy as np
+
+import fixed_point
+from json_script import load_jig_geometry
+
+
+class _Segment:
+    """
+    线段端点为整数微米（fixed_point 网格）；扫描中的事件点可能是有理数交点（Fraction），
+    所有比较都是精确的整数/有理数运算，不需要吸附网格或距离容差。
+    """
+
+    __slots__ = ("id", "unit", "index", "rank", "x1", "y1", "x2", "y2", "slope")
+
+    def __init__(self, seg_id, unit, index, rank, p, q):
+        self.id = seg_id
+        self.unit = unit
+        self.index = index
+        self.rank = rank
+        # 左端点为 (x, y) 字典序较小的端点
+        (self.x1, self.y1), (self.x2, self.y2) = sorted((p, q))
+        dx = self.x2 - self.x1
+        self.slope = Fraction(self.y2 - self.y1, dx) if dx else math.inf
+
+    def below(self, x, y):
+        """Whether the segment passes strictly below the point (x, y) on the vertical line through it."""
+        if self.x1 == self.x2:
+            # 竖直线段：取事件点y值在线段范围内的投影
+            return self.y2 < y
+        return fixed_point.cross((self.x1, self.y1), (self.x2, self.y2), (x, y)) > 0
+
+    def contains(self, x, y):
+        return (fixed_point.cross((self.x1, self.y1), (self.x2, self.y2), (x, y)) == 0 and
+                self.x1 <= x <= self.x2 and min(self.y1, self.y2) <= y <= max(self.y1, self.y2))
+
+    def is_endpoint(self, point):
+        return point == (self.x1, self.y1) or point == (self.x2, self.y2)
+
+
+def _intersection(a, b):
+    """Returns the exact single intersection point of two segments, or None if parallel/disjoint."""
+    try:
+        x, y = fixed_point.line_intersection((a.x1, a.y1), (a.x2, a.y2), (b.x1, b.y1), (b.x2, b.y2))
+    except ValueError:
+        return None
+    # 整数交点保持为 int，使其与顶点事件相等且哈希一致
+    return (x.numerator if x.denominator == 1 else x), (y.numerator if y.denominator == 1 else y)
+
+
+def _folds_back(a, b, point):
+    """
+    For collinear segments sharing the vertex `point`: True when they overlap beyond it,
+    i.e. both other endpoints lie on the same side of the shared vertex.
+    """
+    ax, ay = (a.x2, a.y2) if (a.x1, a.y1) == point else (a.x1, a.y1)
+    bx, by = (b.x2, b.y2) if (b.x1, b.y1) == point else (b.x1, b.y1)
+    return (ax - point[0]) * (bx - point[0]) + (ay - point[1]) * (by - point[1]) > 0
+
+
+def _collinear(a, b):
+    p, q = (a.x1, a.y1), (a.x2, a.y2)
+    return fixed_point.cross(p, q, (b.x1, b.y1)) == 0 and fixed_point.cross(p, q, (b.x2, b.y2)) == 0
+
+
+def build_segments(units):
+    """
+    将各单元的折线拆成线段。units 为 [(name, coords)]，coords 为毫米坐标，量化到整数微米；
+    长度为零的线段被忽略，rank 为线段在单元内（去掉零长度线段后）的顺序，用于识别相邻线段。
+    """
+    segments = []
+    closed = {}
+    counts = {}
+    for unit, coords in units:
+        points = [tuple(p) for p in fixed_point.to_um(np.asarray(coords, dtype=np.float64).reshape(-1, 2)).tolist()]
+        rank = 0
+        for k in range(len(points) - 1):
+            if points[k] == points[k + 1]:
+                continue
+            segments.append(_Segment(len(segments), unit, k, rank, points[k], points[k + 1]))
+            rank += 1
+        counts[unit] = rank
+        closed[unit] = len(points) > 2 and points[0] == points[-1]
+    return segments, closed, counts
+
+
+def find_intersections(segments, closed=None, counts=None):
+    """
+    Bentley-Ottmann 扫描线求所有线段交点。事件队列为堆，O((n + k) log n)；状态结构为Python有序列表，
+    定位为二分查找，但每个事件的切片替换是 O(n) 的内存移动，最坏总复杂度 O((n + k) n)。
+    对治具轮廓（状态列表通常只有几十到几百条线段）这部分开销很小。
+    在同一事件点上同时处理以该点为左端点、右端点和内部点的线段，
+    因此共点、竖直线段和共线重叠都能正确处理。线段端点为整数微米，交点为精确有理数，
+    方向、共线和“点在线段上”的判断都没有浮点误差。
+    返回按交点排序的记录列表，同一单元内相邻线段在公共顶点处的相接不算交点。
+    """
+    closed = closed or {}
+    counts = counts or {}
+    starts = {}
+    queue = []
+    queued = set()
+
+    def push(point):
+        if point not in queued:
+            queued.add(point)
+            heapq.heappush(queue, point)
+
+    for seg in segments:
+        starts.setdefault((seg.x1, seg.y1), []).append(seg)
+        push((seg.x1, seg.y1))
+        push((seg.x2, seg.y2))
+
+    status = []
+    reported = set()
+    results = []
+
+    def adjacent(a, b, point):
+        if a.unit != b.unit:
+            return False
+        gap = abs(a.rank - b.rank)
+        last = counts.get(a.unit, 0) - 1
+        neighbours = gap == 1 or (closed.get(a.unit) and gap == last and last > 1)
+        if not (neighbours and a.is_endpoint(point) and b.is_endpoint(point)):
+            return False
+        # 同一直线被拆成两段 G01 时只在公共顶点相接，不算交点；折返（方向相反）时才是重叠
+        return not (_collinear(a, b) and _folds_back(a, b, point))
+
+    def report(a, b, point):
+        if a.id > b.id:
+            a, b = b, a
+        key = (a.id, b.id)
+        if key in reported or adjacent(a, b, point):
+            return
+        reported.add(key)
+        if _collinear(a, b):
+            kind = "overlap"
+        elif a.is_endpoint(point) or b.is_endpoint(point):
+            kind = "touch"
+        else:
+            kind = "cross"
+        results.append({'unit_a': a.unit, 'segment_a': a.index, 'unit_b': b.unit, 'segment_b': b.index,
+                        'x': round(float(point[0]) / fixed_point.UM_PER_MM, 6),
+                        'y': round(float(point[1]) / fixed_point.UM_PER_MM, 6), 'kind': kind})
+
+    def check(a, b, point):
+        q = _intersection(a, b)
+        if q is not None and q > point:
+            push(q)
+
+    while queue:
+        point = heapq.heappop(queue)
+        x, y = point
+
+        # 在状态列表中定位经过该点的线段（它们在列表中连续）
+        lo, hi = 0, len(status)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if status[mid].below(x, y):
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo > 0 and status[lo - 1].contains(x, y):
+            lo -= 1
+        hi = lo
+        while hi < len(status) and status[hi].contains(x, y):
+            hi += 1
+        through = status[lo:hi]
+        upper = starts.pop(point, [])
+
+        involved = through + upper
+        if len(involved) > 1:
+            for i in range(len(involved)):
+                for j in range(i + 1, len(involved)):
+                    report(involved[i], involved[j], point)
+
+        # 删除在该点结束的线段，经过该点的线段按该点右侧的顺序（斜率）重新插入
+        continuing = [s for s in through if (s.x2, s.y2) != point]
+        inserted = sorted(continuing + upper, key=lambda s: s.slope)
+        status[lo:hi] = inserted
+
+        if not inserted:
+            if 0 < lo < len(status):
+                check(status[lo - 1], status[lo], point)
+        else:
+            if lo > 0:
+                check(status[lo - 1], inserted[0], point)
+            end = lo + len(inserted)
+            if end < len(status):
+                check(inserted[-1], status[end], point)
+
+    results.sort(key=lambda r: (r['x'], r['y']))
+    return results
+
+
+def fixture_of(unit_name):
+    return "top" if "TOP" in os.path.basename(unit_name).upper() else "bottom"
+
+
+def check_outlines(units):
+    """
+    对处理后的轮廓做自交和相互重叠检查。上、下治具的单元分别检查，不互相比较。
+    返回 {'segments': n, 'intersections': [...], 'self_intersections': n, 'unit_overlaps': n}。
+    """
+    groups = {}
+    for unit, coords in units:
+        groups.setdefault(fixture_of(unit), []).append((unit, coords))
+
+    total_segments = 0
+    intersections = []
+    for fixture, group in sorted(groups.items()):
+        segments, closed, counts = build_segments(group)
+        total_segments += len(segments)
+        for record in find_intersections(segments, closed, counts):
+            record['fixture'] = fixture
+            intersections.append(record)
+
+    self_count = sum(1 for r in intersections if r['unit_a'] == r['unit_b'])
+    return {
+        'segments': total_segments,
+        'intersections': intersections,
+        'self_intersections': self_count,
+        'unit_overlaps': len(intersections) - self_count,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python outline_check.py <rut_files...>", file=sys.stderr)
+        sys.exit(1)
+
+    processed_units, _ = load_jig_geometry(sys.argv[1:], None)
+    print(json.dumps(check_outlines([(name, coords.tolist()) for name, coords in processed_units])))
@@ -0,0 +1,232 @@
+import sys
+import json
+import xml.etree.ElementTree as ET
+import numpy as np
+
+import transform
+import fixed_point
+from pin_table import PinTable, read_pin_table
+from parse_fails import parse_fail_log
+
+
+def read_block_results(xml_source):
+    """
+    读取TestResult XML中的 BlockTestComplete 记录。
+    `xml_source` 可以是文件路径或XML字符串；返回 [{'block': (BlockX, BlockY), 'serial', 'panel_id', 'result', 'path', 'result_path'}]。
+    """
+    if xml_source.lstrip().startswith("<"):
+        root = ET.fromstring(xml_source)
+    else:
+        root = ET.parse(xml_source).getroot()
+
+    def text(node, tag):
+        value = node.findtext(tag)
+        return value.strip() if value else None
+
+    results = []
+    for node in root.iter("BlockTestComplete"):
+        try:
+            block = (int(text(node, "BlockX")), int(text(node, "BlockY")))
+        except (TypeError, ValueError):
+            continue
+        results.append({'block': block, 'serial': text(node, "Serial"), 'panel_id': text(node, "PanelID"),
+                        'result': text(node, "Result"), 'path': text(node, "Path"),
+                        'result_path': text(node, "ResultPath")})
+    return results
+
+
+class BlockView:
+    """
+    拼板中单个Block的惰性视图：不复制基础引脚表，坐标在访问时才按该Block的变换计算。
+    """
+
+    def __init__(self, panel, block):
+        self.panel = panel
+        self.block = block
+        self.matrix = panel.matrices[panel.block_index(block)]
+
+    def __len__(self):
+        return len(self.panel.base)
+
+    @property
+    def no(self):
+        return self.panel.base.no
+
+    @property
+    def side(self):
+        return self.panel.base.side
+
+    @property
+    def xy(self):
+        return transform.apply_transform(self.matrix, self.panel.base.xy)
+
+    def locate(self, pin_numbers):
+        """Coordinates of the given pin numbers in this block; unknown numbers give NaN."""
+        return self.panel.locate([self.block] * len(pin_numbers), pin_numbers)
+
+    def to_table(self):
+        """Materializes this block as a PinTable (one block's worth of memory)."""
+        return self.panel.base.with_xy(self.xy)
+
+
+class Panel:
+    """
+    拼板模型：一份基础PinTable加上每个Block的3x3变换（step-and-repeat）。
+    全部Block的引脚从不展开存储；按Block查询、失败引脚定位和区域查询都只计算所需的点，
+    渲染端用 render_transforms() 给出的矩阵重复绘制同一份基础几何。
+    """
+
+    def __init__(self, base, blocks):
+        """`blocks` 为 [((BlockX, BlockY), 3x3矩阵)]，矩阵作用在基础引脚表坐标上。"""
+        self.base = base
+        self.blocks = [tuple(key) for key, _ in blocks]
+        self.matrices = np.asarray([m for _, m in blocks], dtype=np.float64).reshape(-1, 3, 3)
+        self._positions = {key: i for i, key in enumerate(self.blocks)}
+        # 引脚编号 -> 行号的排序索引，重复编号取第一行（与渲染端按编号取坐标一致）
+        order = np.argsort(base.no, kind="stable")
+        numbers = base.no[order]
+        first = np.ones(len(numbers), dtype=bool)
+        first[1:] = numbers[1:] != numbers[:-1]
+        self._sorted_no = numbers[first]
+        self._sorted_rows = order[first]
+
+    @classmethod
+    def from_grid(cls, base, columns, rows, pitch_x, pitch_y):
+        """Regular step-and-repeat: block (1, 1) is the base layout, block (i, j) is shifted by (i-1, j-1) pitches."""
+        blocks = [((bx, by), transform.translation((bx - 1) * pitch_x, (by - 1) * pitch_y))
+                  for by in range(1, rows + 1) for bx in range(1, columns + 1)]
+        return cls(base, blocks)
+
+    def __len__(self):
+        """Total number of pins on the panel (blocks x base pins)."""
+        return len(self.blocks) * len(self.base)
+
+    @property
+    def nbytes(self):
+        base = self.base
+        return (base.no.nbytes + base.xy_um.nbytes + base.side.nbytes + base.unit.nbytes
+                + self.matrices.nbytes + self._sorted_no.nbytes + self._sorted_rows.nbytes)
+
+    def block_index(self, block):
+        try:
+            return self._positions[tuple(block)]
+        except KeyError:
+            raise KeyError(f"Unknown block {tuple(block)}") from None
+
+    def block(self, block):
+        return BlockView(self, block)
+
+    def rows_of(self, pin_numbers):
+        """Base-table rows of the given pin numbers; -1 where the number does not exist."""
+        pin_numbers = np.asarray(pin_numbers, dtype=np.int64).reshape(-1)
+        if len(self._sorted_no) == 0:
+            return np.full(len(pin_numbers), -1, dtype=np.intp)
+        position = np.minimum(np.searchsorted(self._sorted_no, pin_numbers), len(self._sorted_no) - 1)
+        return np.where(self._sorted_no[position] == pin_numbers, self._sorted_rows[position], -1)
+
+    def locate(self, blocks, pin_numbers):
+        """
+        失败引脚定位：对每个 (block, 引脚编号) 只计算这一个点的坐标，返回 (N, 2) 数组，
+        编号不存在时为 NaN。内存与查询数量成正比，与Block数无关。
+        """
+        rows = self.rows_of(pin_numbers)
+        index = np.fromiter((self.block_index(b) for b in blocks), dtype=np.intp, count=len(rows))
+        # 先按行取整数坐标再换算为毫米，不生成整张基础表的浮点坐标
+        xy = fixed_point.to_mm(self.base.xy_um[np.maximum(rows, 0)]) if len(self.base) else np.zeros((len(rows), 2))
+        located = transform.apply_transforms(self.matrices, index, xy) if len(rows) else np.empty((0, 2))
+        located[rows < 0] = np.nan
+        return located
+
+    def query_rect(self, min_x, min_y, max_x, max_y, side=None):
+        """
+        区域查询：返回 [(block, 基础表行号数组)]。每个Block先把查询窗口逆变换到基础坐标系做包围盒粗筛，
+        再只对候选点正向变换精确判断，不生成整板坐标。
+        """
+        base_xy = self.base.xy
+        side_mask = self.base.side == side if side else None
+        corners = np.array([[min_x, min_y], [max_x, min_y], [max_x, max_y], [min_x, max_y]])
+        hits = []
+        for key, matrix in zip(self.blocks, self.matrices):
+            local = transform.apply_transform(np.linalg.inv(matrix), corners)
+            low, high = local.min(axis=0), local.max(axis=0)
+            mask = np.all((base_xy >= low) & (base_xy <= high), axis=1)
+            if side_mask is not None:
+                mask &= side_mask
+            rows = np.flatnonzero(mask)
+            if len(rows):
+                xy = transform.apply_transform(matrix, base_xy[rows])
+                inside = (xy[:, 0] >= min_x) & (xy[:, 0] <= max_x) & (xy[:, 1] >= min_y) & (xy[:, 1] <= max_y)
+                rows = rows[inside]
+            if len(rows):
+                hits.append((key, rows))
+        return hits
+
+    def iter_blocks(self):
+        """Yields (block, BlockView) in panel order; each view's coordinates are computed on demand."""
+        for key in self.blocks:
+            yield key, BlockView(self, key)
+
+    def expand(self):
+        """
+        把整板展开为一个PinTable（Block数 x 引脚数行），仅用于导出等确实需要全部坐标的场合。
+        使用广播一次完成所有Block的变换。
+        """
+        base = self.base
+        xy = np.einsum("bij,nj->bni", self.matrices[:, :2, :2], base.xy) + self.matrices[:, None, :2, 2]
+        count = len(self.blocks)
+        return PinTable(np.tile(base.no, count), xy[..., 0].reshape(-1), xy[..., 1].reshape(-1),
+                        np.tile(base.side, count), np.tile(base.unit, count))
+
+    def render_transforms(self):
+        """Per-block SVG `matrix(a b c d e f)` parameters for drawing the base geometry with <use>."""
+        return [{'block_x': bx, 'block_y': by,
+                 'matrix': m[:2, :].T.reshape(-1).tolist()}
+                for (bx, by), m in zip(self.blocks, self.matrices)]
+
+    def join_failures(self, block_results):
+        """
+        把 read_block_results 的NG记录与其NG日志连接：每条失败引脚附带所在Block和板上坐标。
+        返回 [{'block_x', 'block_y', 'serial', 'pin', 'error_type', 'x', 'y'}]；不在拼板上的Block被跳过，未知编号的坐标为 None。
+        """
+        keys, pins, records = [], [], []
+        for result in block_results:
+            if result['result'] != "NG" or not result['path']:
+                continue
+            if tuple(result['block']) not in self._positions:
+                print(f"Warning: block {result['block']} is not on the panel", file=sys.stderr)
+                continue
+            for fail in parse_fail_log(result['path']):
+                keys.append(result['block'])
+                pins.append(fail['pin'])
+                records.append({'block_x': result['block'][0], 'block_y': result['block'][1],
+                                'serial': result['serial'], 'pin': fail['pin'], 'error_type': fail['error_type']})
+
+        located = self.locate(keys, pins) if records else np.empty((0, 2))
+        for record, (x, y) in zip(records, located.tolist()):
+            found = not (np.isnan(x) or np.isnan(y))
+            record['x'] = x if found else None
+            record['y'] = y if found else None
+        return records
+
+
+def parse_grid(text):
+    """Parses `COLUMNSxROWS` (e.g. `4x5`)."""
+    columns, rows = text.lower().split("x")
+    return int(columns), int(rows)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        print("Usage: python panel.py <adr_file> --grid 4x5 --pitch PX,PY [--xml TestResult.xml]", file=sys.stderr)
+        sys.exit(1)
+
+    options = dict(zip(sys.argv[2::2], sys.argv[3::2]))
+    columns, rows = parse_grid(options.get("--grid", "1x1"))
+    pitch_x, pitch_y = (float(v) for v in options.get("--pitch", "0,0").split(","))
+    panel = Panel.from_grid(read_pin_table(sys.argv[1]), columns, rows, pitch_x, pitch_y)
+
+    output = {'blocks': panel.render_transforms(), 'pins_per_block': len(panel.base),
+              'total_pins': len(panel), 'nbytes': panel.nbytes}
+    if "--xml" in options:
+        output['failures'] = panel.join_failures(read_block_results(options["--xml"]))
+    print(json.dumps(output))
@@ -1,6 +1,7 @@
 import sys
 import csv
 import json
+from collections import Counter
 
 def parse_fail_log(file_path):
     """Parses a CSV fail log to extract failure pin numbers."""
@@ -26,12 +27,153 @@ def parse_fail_log(file_path):
 
     return failed_pins
 
+def parse_fail_edges(file_path):
+    """
+    Parses a CSV fail log and keeps the Pin1-Pin2 pairs as edges.
+    Returns a list of (pin1, pin2, error_type) with pin1 <= pin2; rows naming a single pin are skipped.
+    """
+    edges = []
+    try:
+        with open(file_path, mode='r', encoding='utf-8') as csvfile:
+            reader = csv.DictReader(csvfile)
+            for row in reader:
+                pin1 = row.get('Pin1')
+                pin2 = row.get('Pin2')
+                if pin1 and pin2 and pin1.isdigit() and pin2.isdigit():
+                    a, b = int(pin1), int(pin2)
+                    if a > b:
+                        a, b = b, a
+                    edges.append((a, b, row.get('Item', 'UNKNOWN')))
+    except Exception as e:
+        print(f"Error processing file {file_path}: {e}", file=sys.stderr)
+        return []
+
+    return edges
+
+class UnionFind:
+    """Disjoint-set forest over arbitrary hashable keys (union by size, path halving)."""
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    def find(self, item):
+        parent = self.parent
+        if item not in parent:
+            parent[item] = item
+            self.size[item] = 1
+            return item
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+
+class FailureGraph:
+    """
+    多个NG日志的失败图：节点为引脚，边为同一行中的 Pin1-Pin2（如短路对）。
+    边按 (pin1, pin2, error_type) 计数，相同引脚对在多份日志中重复出现时累加。
+    """
+
+    def __init__(self):
+        self.edge_counts = Counter()
+        self.logs = 0
+
+    def add_log(self, file_path):
+        self.edge_counts.update(parse_fail_edges(file_path))
+        self.logs += 1
+
+    def add_edges(self, edges):
+        self.edge_counts.update(edges)
+
+    def pair_counts(self, error_types=None):
+        """Edge frequencies per pin pair, optionally restricted to some error types."""
+        counts = Counter()
+        for (a, b, error_type), count in self.edge_counts.items():
+            if error_types is None or error_type in error_types:
+                counts[(a, b)] += count
+        return counts
+
+    def clusters(self, min_count=1, error_types=None):
+        """
+        用并查集把出现次数不少于 min_count 的边连成连通分量，
+        按引脚数从大到小返回每个分量的引脚、边数、累计出现次数和错误类型分布。
+        """
+        pairs = self.pair_counts(error_types)
+        uf = UnionFind()
+        for (a, b), count in pairs.items():
+            if count >= min_count:
+                uf.union(a, b)
+
+        components = {}
+        for pin in list(uf.parent):
+            component = components.setdefault(uf.find(pin), {'pins': [], 'edges': 0, 'occurrences': 0,
+                                                             'error_types': Counter()})
+            component['pins'].append(pin)
+        for (a, b, error_type), count in self.edge_counts.items():
+            if error_types is not None and error_type not in error_types:
+                continue
+            if pairs[(a, b)] < min_count:
+                continue
+            component = components[uf.find(a)]
+            component['occurrences'] += count
+            component['error_types'][error_type] += count
+        for (a, b), count in pairs.items():
+            if count >= min_count:
+                components[uf.find(a)]['edges'] += 1
+
+        result = []
+        for component in components.values():
+            component['pins'].sort()
+            component['error_types'] = dict(component['error_types'])
+            result.append(component)
+        result.sort(key=lambda c: (-len(c['pins']), -c['occurrences'], c['pins'][0]))
+        return result
+
+    def summary(self, min_count=1, error_types=None, top=20):
+        pairs = self.pair_counts(error_types)
+        clusters = self.clusters(min_count, error_types)
+        return {
+            'logs': self.logs,
+            'edges': sum(pairs.values()),
+            'distinct_pairs': len(pairs),
+            'min_count': min_count,
+            'clusters': len(clusters),
+            'largest_clusters': clusters[:top],
+            'frequent_pairs': [{'pin1': a, 'pin2': b, 'count': count}
+                               for (a, b), count in pairs.most_common(top)],
+        }
+
 if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--graph":
+        # python parse_fails.py --graph <csv...> [--min-count N] [--top N] [--types SHORT,OPEN]
+        files, options = [], {}
+        args = iter(sys.argv[2:])
+        for arg in args:
+            if arg in ("--min-count", "--top", "--types"):
+                options[arg] = next(args, "")
+            else:
+                files.append(arg)
+        graph = FailureGraph()
+        for log_path in files:
+            graph.add_log(log_path)
+        types = set(options["--types"].split(",")) if options.get("--types") else None
+        print(json.dumps(graph.summary(int(options.get("--min-count", 1)), types, int(options.get("--top", 20)))))
     # The first argument from command line is the file path
-    if len(sys.argv) > 1:
+    elif len(sys.argv) > 1:
         file_path = sys.argv[1]
         results = parse_fail_log(file_path)
         # Output the results as a JSON string to stdout
         print(json.dumps(results))
     else:
-        print("Usage: python parse_fails.py <path_to_csv_file>", file=sys.stderr)
\ No newline at end of file
+        print("Usage: python parse_fails.py <path_to_csv_file>", file=sys.stderr)
+        print("       python parse_fails.py --graph <csv_files...> [--min-count N] [--top N] [--types A,B]", file=sys.stderr)
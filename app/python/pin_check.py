@@ -0,0 +1,158 @@
+import sys
+import json
+
+import numpy as np
+
+import fixed_point
+from pin_table import read_pin_table
+
+DEFAULT_MIN_PITCH = 0.18
+DEFAULT_REPORT_LIMIT = 1000
+
+# 只需和自身及“前方”4个相邻单元比较，每对单元只被访问一次
+NEIGHBOUR_OFFSETS = ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1))
+
+
+def _cell_pairs(starts, counts, first, second, same_cell):
+    """
+    Expands matching cell pairs into point-index pairs (positions in the cell-sorted order).
+    Every point of cell `first[k]` is paired with every point of cell `second[k]`.
+    """
+    c1 = counts[first]
+    c2 = counts[second]
+    sizes = c1 * c2
+    total = int(sizes.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    owner = np.repeat(np.arange(len(first)), sizes)
+    local = np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    i = local // c2[owner]
+    j = local % c2[owner]
+    a = starts[first][owner] + i
+    b = starts[second][owner] + j
+    if same_cell:
+        keep = i < j
+        a, b = a[keep], b[keep]
+    return a, b
+
+
+def _check_pitch(pitch):
+    if not pitch > 0:
+        raise ValueError(f"pitch must be > 0, got {pitch}")
+
+
+def find_close_pairs(xy_um, pitch=DEFAULT_MIN_PITCH):
+    """
+    空间哈希查找距离小于 pitch（mm）的所有点对，xy_um 为整数微米坐标：网格单元边长等于 pitch，
+    只比较相邻单元中的点，复杂度为 O(N)（在引脚本身满足间距要求时）。
+    距离比较用整数微米距离的平方对比 pitch 微米值的平方，正好等于最小间距的引脚不算过近。
+    返回 (i, j, distance) 三个数组，i < j 为输入中的下标，distance 单位为mm。
+    pitch 必须为正数，否则抛出 ValueError。
+    """
+    _check_pitch(pitch)
+    xy_um = np.asarray(xy_um, dtype=np.int64).reshape(-1, 2)
+    if len(xy_um) < 2:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0)
+
+    pitch_um = int(fixed_point.to_um(pitch, dtype=np.int64))
+    pitch_sq = pitch_um * pitch_um
+    cells = (xy_um - xy_um.min(axis=0)) // max(pitch_um, 1)
+    width = int(cells[:, 1].max()) + 3
+    keys = (cells[:, 0] + 1) * width + (cells[:, 1] + 1)
+    order = np.argsort(keys, kind="stable")
+    unique, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+
+    found_i, found_j, found_d = [], [], []
+    for dx, dy in NEIGHBOUR_OFFSETS:
+        target = unique + dx * width + dy
+        idx = np.searchsorted(unique, target)
+        idx[idx == len(unique)] = 0
+        hit = unique[idx] == target
+        a, b = _cell_pairs(starts, counts, np.flatnonzero(hit), idx[hit], same_cell=(dx, dy) == (0, 0))
+        if len(a) == 0:
+            continue
+        pa, pb = order[a], order[b]
+        delta = xy_um[pa] - xy_um[pb]
+        d_sq = delta[:, 0] * delta[:, 0] + delta[:, 1] * delta[:, 1]
+        close = d_sq < pitch_sq
+        found_i.append(np.minimum(pa, pb)[close])
+        found_j.append(np.maximum(pa, pb)[close])
+        found_d.append(fixed_point.to_mm(np.sqrt(d_sq[close])))
+
+    if not found_i:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0)
+    i, j, d = np.concatenate(found_i), np.concatenate(found_j), np.concatenate(found_d)
+    sort = np.lexsort((j, i))
+    return i[sort], j[sort], d[sort]
+
+
+def check_pins(pin_table, pitch=DEFAULT_MIN_PITCH, limit=DEFAULT_REPORT_LIMIT):
+    """
+    检查ADR引脚：重复编号、完全重合的位置、同一面上间距小于 pitch 的引脚对。
+    各列表最多返回 limit 条，计数字段给出总数。pitch 不是正数时抛出 ValueError。
+    """
+    _check_pitch(pitch)
+    report = {'pins': len(pin_table), 'pitch': pitch}
+
+    numbers, counts = np.unique(pin_table.no, return_counts=True)
+    duplicated = counts > 1
+    report['duplicate_number_count'] = int(duplicated.sum())
+    report['duplicate_numbers'] = [{'no': no, 'count': count} for no, count in
+                                   zip(numbers[duplicated][:limit].tolist(), counts[duplicated][:limit].tolist())]
+
+    duplicate_positions = []
+    too_close = []
+    duplicate_position_count = 0
+    too_close_count = 0
+    for side in np.unique(pin_table.side).tolist():
+        pins = pin_table.for_side(side)
+        i, j, d = find_close_pairs(pins.xy_um, pitch)
+        # 重合判断在整数微米坐标上进行，不受浮点误差影响
+        xy_um = pins.xy_um
+        keys = fixed_point.point_keys(xy_um)
+        exact = keys[i] == keys[j]
+
+        # 完全重合的位置按坐标分组，一组列出所有引脚编号
+        if exact.any():
+            involved = np.unique(np.concatenate((i[exact], j[exact])))
+            groups, _, inverse, _ = fixed_point.dedupe_points(xy_um[involved])
+            duplicate_position_count += len(groups)
+            for g, (x, y) in enumerate(fixed_point.to_mm(groups).tolist()):
+                if len(duplicate_positions) >= limit:
+                    break
+                duplicate_positions.append({'side': side, 'x': x, 'y': y,
+                                            'pins': pins.no[involved[inverse == g]].tolist()})
+
+        near = ~exact
+        too_close_count += int(near.sum())
+        remaining = max(0, limit - len(too_close))
+        for a, b, dist in zip(pins.no[i[near]][:remaining].tolist(),
+                              pins.no[j[near]][:remaining].tolist(),
+                              d[near][:remaining].tolist()):
+            too_close.append({'side': side, 'pin1': a, 'pin2': b, 'distance': round(dist, 4)})
+
+    report['duplicate_position_count'] = duplicate_position_count
+    report['duplicate_positions'] = duplicate_positions
+    report['too_close_count'] = too_close_count
+    report['too_close'] = too_close
+    report['ok'] = not (report['duplicate_number_count'] or duplicate_position_count or too_close_count)
+    return report
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python pin_check.py <adr_file> [--pitch <mm>] [--limit <n>]", file=sys.stderr)
+        sys.exit(1)
+
+    options = dict(zip(sys.argv[2::2], sys.argv[3::2]))
+    try:
+        table = read_pin_table(sys.argv[1])
+        result = check_pins(table,
+                            pitch=float(options.get("--pitch", DEFAULT_MIN_PITCH)),
+                            limit=int(options.get("--limit", DEFAULT_REPORT_LIMIT)))
+        print(json.dumps(result))
+    except (ValueError, OSError) as e:
+        print(f"Error checking ADR file: {e}", file=sys.stderr)
+        sys.exit(1)
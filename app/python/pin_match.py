@@ -0,0 +1,178 @@
+import sys
+import json
+
+import numpy as np
+
+import transform
+from pin_table import read_pin_table
+
+DEFAULT_TOLERANCE = 0.05
+DEFAULT_ITERATIONS = 3
+DEFAULT_REPORT_LIMIT = 1000
+HISTOGRAM_BINS = 10
+
+# 查询点所在单元及其8个相邻单元
+NEIGHBOUR_OFFSETS = tuple((dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+
+
+def candidate_pairs(query, reference, radius):
+    """
+    网格近邻：单元边长为 radius，每个查询点只与相邻9个单元中的参考点比较，
+    近似线性时间。返回距离不超过 radius 的所有 (i, j, distance)，i/j 分别为 query/reference 下标。
+    """
+    query = np.asarray(query, dtype=np.float64).reshape(-1, 2)
+    reference = np.asarray(reference, dtype=np.float64).reshape(-1, 2)
+    empty = np.empty(0, dtype=np.int64)
+    if len(query) == 0 or len(reference) == 0 or radius <= 0:
+        return empty, empty, np.empty(0)
+
+    origin = np.minimum(query.min(axis=0), reference.min(axis=0))
+    q_cells = np.floor((query - origin) / radius).astype(np.int64)
+    r_cells = np.floor((reference - origin) / radius).astype(np.int64)
+    width = int(max(q_cells[:, 1].max(), r_cells[:, 1].max())) + 3
+    q_keys = (q_cells[:, 0] + 1) * width + (q_cells[:, 1] + 1)
+    r_keys = (r_cells[:, 0] + 1) * width + (r_cells[:, 1] + 1)
+    order = np.argsort(r_keys, kind="stable")
+    unique, starts, counts = np.unique(r_keys[order], return_index=True, return_counts=True)
+
+    found_i, found_j, found_d = [], [], []
+    for dx, dy in NEIGHBOUR_OFFSETS:
+        target = q_keys + dx * width + dy
+        idx = np.searchsorted(unique, target)
+        idx[idx == len(unique)] = 0
+        hit = np.flatnonzero(unique[idx] == target)
+        if len(hit) == 0:
+            continue
+        sizes = counts[idx[hit]]
+        i = np.repeat(hit, sizes)
+        local = np.arange(len(i)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        j = order[np.repeat(starts[idx[hit]], sizes) + local]
+        d = np.hypot(query[i, 0] - reference[j, 0], query[i, 1] - reference[j, 1])
+        close = d <= radius
+        found_i.append(i[close])
+        found_j.append(j[close])
+        found_d.append(d[close])
+
+    if not found_i:
+        return empty, empty, np.empty(0)
+    return np.concatenate(found_i), np.concatenate(found_j), np.concatenate(found_d)
+
+
+def match_points(query, reference, radius):
+    """
+    一对一最近邻匹配：在半径内的候选对中反复接受“互为最近”的点对并移除已匹配的点，
+    全局最近的候选对总是互为最近，因此每轮至少确定一对。返回 (i, j, distance)。
+    """
+    i, j, d = candidate_pairs(query, reference, radius)
+    order = np.lexsort((j, i, d))
+    i, j, d = i[order], j[order], d[order]
+
+    matched_i, matched_j, matched_d = [], [], []
+    while len(i):
+        # 已按距离排序：每个 i、每个 j 的第一次出现即其最近候选
+        best_for_i = np.zeros(len(i), dtype=bool)
+        best_for_i[np.unique(i, return_index=True)[1]] = True
+        best_for_j = np.zeros(len(j), dtype=bool)
+        best_for_j[np.unique(j, return_index=True)[1]] = True
+        accepted = best_for_i & best_for_j
+        matched_i.append(i[accepted])
+        matched_j.append(j[accepted])
+        matched_d.append(d[accepted])
+        keep = ~(np.isin(i, i[accepted]) | np.isin(j, j[accepted]))
+        i, j, d = i[keep], j[keep], d[keep]
+
+    if not matched_i:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0)
+    i, j, d = np.concatenate(matched_i), np.concatenate(matched_j), np.concatenate(matched_d)
+    order = np.argsort(i, kind="stable")
+    return i[order], j[order], d[order]
+
+
+def _residual_stats(residuals, tolerance):
+    distance = np.hypot(residuals[:, 0], residuals[:, 1])
+    if len(distance) == 0:
+        return {'count': 0}
+    counts, edges = np.histogram(distance, bins=HISTOGRAM_BINS, range=(0.0, tolerance))
+    p50, p95, p99 = np.percentile(distance, [50, 95, 99]).tolist()
+    return {
+        'count': int(len(distance)),
+        'mean': round(float(distance.mean()), 6),
+        'rms': round(float(np.sqrt(np.mean(distance ** 2))), 6),
+        'p50': round(p50, 6), 'p95': round(p95, 6), 'p99': round(p99, 6),
+        'max': round(float(distance.max()), 6),
+        'histogram': {'edges': np.round(edges, 6).tolist(), 'counts': counts.tolist()},
+    }
+
+
+def match_sides(pin_table, tolerance=DEFAULT_TOLERANCE, mirror="A", search_radius=None,
+                iterations=DEFAULT_ITERATIONS, limit=DEFAULT_REPORT_LIMIT):
+    """
+    A/B面引脚对应检查：镜像 mirror 指定的一面（"A"、"B" 或 None），
+    先在 search_radius（默认等于 tolerance）内匹配并用匹配对位移的中位数估计错位偏移，
+    迭代修正后以 tolerance 做最终一对一匹配。
+    返回未匹配引脚、残差分布、估计偏移以及匹配对拟合的相似变换（旋转、缩放）。
+    """
+    side_a, side_b = pin_table.for_side("A"), pin_table.for_side("B")
+    a, b = side_a.xy, side_b.xy
+    if mirror == "A":
+        a = transform.apply_transform(transform.mirror_x(), a)
+    elif mirror == "B":
+        b = transform.apply_transform(transform.mirror_x(), b)
+
+    offset = np.zeros(2)
+    radius = search_radius or tolerance
+    for _ in range(iterations):
+        i, j, _ = match_points(a + offset, b, radius)
+        if len(i) == 0:
+            break
+        offset = offset + np.median(b[j] - (a[i] + offset), axis=0)
+        radius = tolerance
+
+    i, j, _ = match_points(a + offset, b, tolerance)
+    residuals = b[j] - (a[i] + offset)
+    report = {
+        'mirror': mirror, 'tolerance': tolerance,
+        'side_a': len(side_a), 'side_b': len(side_b), 'matched': int(len(i)),
+        'offset': {'x': round(float(offset[0]), 6), 'y': round(float(offset[1]), 6)},
+        'residual': _residual_stats(residuals, tolerance),
+    }
+    if len(i) >= 2:
+        try:
+            m = transform.fit_similarity(a[i], b[j])
+            report['similarity'] = {
+                'rotation_deg': round(float(np.degrees(np.arctan2(m[1, 0], m[0, 0]))), 6),
+                'scale': round(float(np.hypot(m[0, 0], m[1, 0])), 9),
+                'dx': round(float(m[0, 2]), 6), 'dy': round(float(m[1, 2]), 6),
+            }
+        except ValueError:
+            pass
+
+    for key, table, matched in (('unmatched_a', side_a, i), ('unmatched_b', side_b, j)):
+        mask = np.ones(len(table), dtype=bool)
+        mask[matched] = False
+        report[f'{key}_count'] = int(mask.sum())
+        report[key] = table.select(np.flatnonzero(mask)[:limit]).to_records()
+    report['pairs'] = [{'a': int(na), 'b': int(nb)} for na, nb in
+                       zip(side_a.no[i][:limit].tolist(), side_b.no[j][:limit].tolist())]
+    return report
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python pin_match.py <adr_file> [--tolerance 0.05] [--mirror A|B|none] "
+              "[--search-radius mm] [--limit n]", file=sys.stderr)
+        sys.exit(1)
+
+    options = dict(zip(sys.argv[2::2], sys.argv[3::2]))
+    try:
+        mirror = options.get("--mirror", "A")
+        result = match_sides(read_pin_table(sys.argv[1]),
+                             tolerance=float(options.get("--tolerance", DEFAULT_TOLERANCE)),
+                             mirror=None if mirror.lower() == "none" else mirror.upper(),
+                             search_radius=float(options["--search-radius"]) if "--search-radius" in options else None,
+                             limit=int(options.get("--limit", DEFAULT_REPORT_LIMIT)))
+        print(json.dumps(result))
+    except (ValueError, OSError) as e:
+        print(f"Error matching ADR sides: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,277 @@
+import re
+import sys
+import json
+import numpy as np
+
+from pin_table import read_pin_table
+from failure_archive import iter_failures
+
+# 与渲染端配对NG日志和测试结果文件时使用的时间戳格式相同
+LOG_TIMESTAMP_PATTERN = re.compile(r"(\d{8}-\d{6})")
+LATEST_LOG = "latest"
+
+
+class Bitmap:
+    """
+    以 np.packbits 压缩的定长位图（每个引脚1位）。AND/OR/NOT 直接在字节数组上运算，
+    10万引脚的位图只有约12KB，一次组合运算为微秒级。
+    """
+
+    __slots__ = ("bits", "size")
+
+    def __init__(self, bits, size):
+        self.bits = bits
+        self.size = size
+
+    @classmethod
+    def from_mask(cls, mask):
+        mask = np.asarray(mask, dtype=bool)
+        return cls(np.packbits(mask), len(mask))
+
+    @classmethod
+    def from_rows(cls, rows, size):
+        mask = np.zeros(size, dtype=bool)
+        mask[rows] = True
+        return cls.from_mask(mask)
+
+    @classmethod
+    def empty(cls, size):
+        return cls(np.zeros((size + 7) // 8, dtype=np.uint8), size)
+
+    def __and__(self, other):
+        return Bitmap(self.bits & other.bits, self.size)
+
+    def __or__(self, other):
+        return Bitmap(self.bits | other.bits, self.size)
+
+    def __invert__(self):
+        bits = ~self.bits
+        tail = self.size % 8
+        if tail:
+            # 清除末字节中超出长度的填充位
+            bits[-1] &= np.uint8((0xFF << (8 - tail)) & 0xFF)
+        return Bitmap(bits, self.size)
+
+    def to_mask(self):
+        return np.unpackbits(self.bits, count=self.size).astype(bool)
+
+    def rows(self):
+        return np.flatnonzero(self.to_mask())
+
+    def count(self):
+        return int(_POPCOUNT[self.bits].sum())
+
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class PinIndex:
+    """
+    引脚属性查询索引：面（side）、单元（unit）和失败标记各预先建立位图，
+    引脚编号建立排序索引用于范围查询。查询结果为 Bitmap，可用 & | ~ 组合。
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.size = len(table)
+        self.sides = {value: Bitmap.from_mask(table.side == value) for value in np.unique(table.side).tolist()}
+        self.units = {value: Bitmap.from_mask(table.unit == value) for value in np.unique(table.unit).tolist()}
+        self._order = np.argsort(table.no, kind="stable")
+        self._sorted_no = table.no[self._order]
+        # (log, error_type) -> Bitmap；按任意类型/任意日志的并集在首次查询时生成并缓存
+        self.failures = {}
+        self._failure_cache = {}
+        # 日志的登记顺序，用于在日志名中没有时间戳时确定最新的日志
+        self._log_order = {}
+
+    def add_failures(self, records, log=None):
+        """
+        登记一份NG日志的失败引脚（parse_fail_log 的 [{'pin', 'error_type'}] 结果）。
+        同一编号的所有行都会被标记；`log` 用于区分不同日志或批次。
+        """
+        if log is not None:
+            self._log_order.setdefault(log, len(self._log_order))
+        by_type = {}
+        for record in records:
+            by_type.setdefault(record['error_type'], []).append(record['pin'])
+        for error_type, pins in by_type.items():
+            bitmap = Bitmap.from_mask(np.isin(self.table.no, np.asarray(pins, dtype=np.int64)))
+            key = (log, error_type)
+            self.failures[key] = self.failures[key] | bitmap if key in self.failures else bitmap
+        self._failure_cache.clear()
+
+    def add_failures_from_db(self, db_path, logs=None):
+        """
+        从 jig_data.db 登记失败引脚（实时表和 failure_archive 归档一并读取），按 log_file 分组；
+        `logs` 可限定日志文件。日志按其最后一条记录的月份依次登记，供 `latest` 选择使用。
+        """
+        grouped = {}
+        months = {}
+        for pin, error_type, log_file, month in iter_failures(db_path, log_files=logs):
+            grouped.setdefault(log_file, []).append({'pin': pin, 'error_type': error_type or 'UNKNOWN'})
+            months[log_file] = max(months.get(log_file) or "", month or "")
+        for log_file in sorted(grouped, key=lambda name: months[name]):
+            self.add_failures(grouped[log_file], log_file)
+        return list(grouped)
+
+    def side(self, value):
+        return self.sides[value] if value in self.sides else Bitmap.empty(self.size)
+
+    def unit(self, value):
+        return self.units[value] if value in self.units else Bitmap.empty(self.size)
+
+    def number_range(self, low=None, high=None):
+        """Pins with low <= no <= high (either bound may be None)."""
+        start = 0 if low is None else np.searchsorted(self._sorted_no, low, side="left")
+        stop = self.size if high is None else np.searchsorted(self._sorted_no, high, side="right")
+        return Bitmap.from_rows(self._order[start:stop], self.size)
+
+    def latest_log(self):
+        """
+        最新登记的日志：日志名中带有 `YYYYMMDD-HHMMSS` 时间戳（NGLog-20250630-185115.csv）时按时间戳比较，
+        否则按登记顺序；没有登记任何日志时返回 None。
+        """
+        if not self._log_order:
+            return None
+
+        def rank(log):
+            match = LOG_TIMESTAMP_PATTERN.search(log)
+            return (match.group(1) if match else "", self._log_order[log])
+
+        return max(self._log_order, key=rank)
+
+    def failed(self, error_type=None, log=None):
+        """
+        失败标记：error_type 和 log 为 None 时分别表示任意类型、任意日志；
+        log 为 LATEST_LOG（"latest"）时表示最新登记的日志（见 latest_log）。
+        并集结果会缓存，重复查询不再重算。
+        """
+        if log == LATEST_LOG:
+            log = self.latest_log()
+            if log is None:
+                return Bitmap.empty(self.size)
+        key = (log, error_type)
+        if key not in self._failure_cache:
+            result = Bitmap.empty(self.size)
+            for (entry_log, entry_type), bitmap in self.failures.items():
+                if (log is None or entry_log == log) and (error_type is None or entry_type == error_type):
+                    result = result | bitmap
+            self._failure_cache[key] = result
+        return self._failure_cache[key]
+
+    def logs(self):
+        return sorted({log for log, _ in self.failures if log is not None})
+
+    def query(self, expression):
+        """Evaluates a text query (see parse_query) and returns the matching Bitmap."""
+        return parse_query(expression)(self)
+
+    def records(self, bitmap, limit=None):
+        rows = bitmap.rows()
+        if limit is not None:
+            rows = rows[:limit]
+        table = self.table
+        return [{'no': no, 'x': x, 'y': y, 'side': side, 'unit': unit}
+                for no, x, y, side, unit in zip(table.no[rows].tolist(), table.x[rows].tolist(),
+                                                table.y[rows].tolist(), table.side[rows].tolist(),
+                                                table.unit[rows].tolist())]
+
+
+TOKEN_PATTERN = re.compile(r"\s*(\(|\)|[^\s()]+)")
+
+
+def parse_query(expression):
+    """
+    解析文本查询为可调用对象 `f(index) -> Bitmap`。语法（关键字不区分大小写）：
+      side:B   unit:unit3   no:100-200 / no:100- / no:-200 / no:42
+      fail / fail:OPEN / fail:OPEN@NGLog-20250630-185115.csv / fail:*@<log> / fail:OPEN@latest（最新的日志）
+      NOT x,  x AND y,  x OR y,  括号；优先级 NOT > AND > OR。
+    例: `side:B AND unit:unit3 AND fail:OPEN@NGLog-20250821-153611.csv`
+    """
+    tokens = TOKEN_PATTERN.findall(expression)
+    position = [0]
+
+    def peek():
+        return tokens[position[0]] if position[0] < len(tokens) else None
+
+    def take():
+        token = peek()
+        if token is None:
+            raise ValueError(f"Unexpected end of query: {expression}")
+        position[0] += 1
+        return token
+
+    def parse_or():
+        node = parse_and()
+        while (peek() or "").upper() == "OR":
+            take()
+            left, right = node, parse_and()
+            node = lambda index, l=left, r=right: l(index) | r(index)
+        return node
+
+    def parse_and():
+        node = parse_not()
+        while (peek() or "").upper() == "AND":
+            take()
+            left, right = node, parse_not()
+            node = lambda index, l=left, r=right: l(index) & r(index)
+        return node
+
+    def parse_not():
+        if (peek() or "").upper() == "NOT":
+            take()
+            inner = parse_not()
+            return lambda index: ~inner(index)
+        return parse_atom()
+
+    def parse_atom():
+        token = take()
+        if token == "(":
+            node = parse_or()
+            if take() != ")":
+                raise ValueError(f"Missing ')' in query: {expression}")
+            return node
+        return parse_term(token)
+
+    node = parse_or()
+    if peek() is not None:
+        raise ValueError(f"Unexpected token '{peek()}' in query: {expression}")
+    return node
+
+
+def parse_term(token):
+    field, _, value = token.partition(":")
+    field = field.lower()
+    if field == "side" and value:
+        return lambda index: index.side(value)
+    if field == "unit" and value:
+        return lambda index: index.unit(value)
+    if field == "no" and value:
+        low, dash, high = value.partition("-")
+        if not dash:
+            low = high = value
+        low = int(low) if low else None
+        high = int(high) if high else None
+        return lambda index: index.number_range(low, high)
+    if field == "fail":
+        error_type, _, log = value.partition("@")
+        error_type = None if error_type in ("", "*") else error_type
+        log = log or None
+        return lambda index: index.failed(error_type, log)
+    raise ValueError(f"Unknown query term: {token}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python pin_query.py <adr_file> <query> [--db jig_data.db] [--logs a.csv,b.csv] [--limit N]",
+              file=sys.stderr)
+        sys.exit(1)
+
+    options = dict(zip(sys.argv[3::2], sys.argv[4::2]))
+    index = PinIndex(read_pin_table(sys.argv[1]))
+    if "--db" in options:
+        logs = options["--logs"].split(",") if options.get("--logs") else None
+        index.add_failures_from_db(options["--db"], logs)
+    result = index.query(sys.argv[2])
+    print(json.dumps({'count': result.count(),
+                      'pins': index.records(result, int(options["--limit"]) if "--limit" in options else None)}))
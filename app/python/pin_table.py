@@ -0,0 +1,104 @@
+import sys
+import numpy as np
+
+import fixed_point
+
+
+class PinTable:
+    """
+    列式存储的ADR引脚表：编号、坐标、面（A/B）和单元分别保存为NumPy数组，
+    便于对全部引脚做批量（向量化）运算。
+    坐标以整数微米（int32，见 fixed_point）保存为 xy_um，x/y/xy 是由它换算出的毫米浮点视图；
+    构造时传入的毫米坐标会量化到 1 µm 网格（ADR坐标为3位小数，量化是精确的）。
+    """
+
+    def __init__(self, no, x, y, side, unit=None):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        self._init(no, fixed_point.to_um(np.column_stack((x, y)).reshape(-1, 2)), side, unit)
+
+    def _init(self, no, xy_um, side, unit):
+        self.no = np.asarray(no, dtype=np.int64)
+        self.xy_um = np.asarray(xy_um, dtype=np.int32).reshape(-1, 2)
+        self.side = np.asarray(side, dtype=str)
+        if unit is None:
+            unit = np.full(len(self.no), "", dtype=str)
+        self.unit = np.asarray(unit, dtype=str)
+
+    @classmethod
+    def from_um(cls, no, xy_um, side, unit=None):
+        """Builds a table directly from (N, 2) integer micrometre coordinates, without a float round trip."""
+        table = cls.__new__(cls)
+        table._init(no, xy_um, side, unit)
+        return table
+
+    def __len__(self):
+        return len(self.no)
+
+    @property
+    def x(self):
+        return fixed_point.to_mm(self.xy_um[:, 0])
+
+    @property
+    def y(self):
+        return fixed_point.to_mm(self.xy_um[:, 1])
+
+    @property
+    def xy(self):
+        """(N, 2) float64 pin coordinates in mm, derived from xy_um on each access."""
+        return fixed_point.to_mm(self.xy_um)
+
+    def select(self, mask):
+        """Returns a new PinTable with the rows selected by a boolean mask or index array."""
+        return PinTable.from_um(self.no[mask], self.xy_um[mask], self.side[mask], self.unit[mask])
+
+    def for_side(self, side):
+        return self.select(self.side == side)
+
+    def with_xy(self, xy):
+        """Returns a copy of the table with the coordinates replaced by an (N, 2) mm array (quantized to 1 µm)."""
+        return PinTable.from_um(self.no, fixed_point.to_um(np.asarray(xy, dtype=np.float64).reshape(-1, 2)),
+                                self.side, self.unit)
+
+    def to_records(self):
+        """Converts the table to the `{'no', 'x', 'y'}` dicts sent to the renderer."""
+        return [{'no': no, 'x': x, 'y': y}
+                for no, x, y in zip(self.no.tolist(), self.x.tolist(), self.y.tolist())]
+
+    @classmethod
+    def concatenate(cls, tables):
+        tables = list(tables)
+        if not tables:
+            return cls([], [], [], [])
+        return cls.from_um(np.concatenate([t.no for t in tables]),
+                           np.concatenate([t.xy_um for t in tables]),
+                           np.concatenate([t.side for t in tables]),
+                           np.concatenate([t.unit for t in tables]))
+
+
+def parse_adr_lines(lines):
+    """Parses ADR lines (`no X x Y y side unit`) into a PinTable, skipping malformed rows."""
+    no, x, y, side, unit = [], [], [], [], []
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 6:
+            try:
+                pin_no = int(parts[0])
+                pin_x = float(parts[2])
+                pin_y = float(parts[4])
+            except ValueError:
+                continue
+            no.append(pin_no)
+            x.append(pin_x)
+            y.append(pin_y)
+            side.append(parts[5])
+            unit.append(parts[6] if len(parts) > 6 else "")
+    return PinTable(no, x, y, side, unit)
+
+
+def read_pin_table(file_path):
+    """读取ADR文件并返回PinTable。文件不存在时抛出FileNotFoundError，与read_adr_file一致。"""
+    with open(file_path, "r") as file:
+        table = parse_adr_lines(file)
+    print(f"Successfully read ADR file with {len(table)} pins", file=sys.stderr)
+    return table
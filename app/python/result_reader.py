@@ -0,0 +1,233 @@
+import os
+import re
+import sys
+import json
+import mmap
+import bisect
+import hashlib
+import tempfile
+from array import array
+
+# 行偏移索引缓存目录（按文件绝对路径的哈希命名）
+INDEX_CACHE_DIR = os.path.join(tempfile.gettempdir(), "jig_viewer_result_index")
+INDEX_MAGIC = b"JRIX1\n"
+DEFAULT_PAGE_SIZE = 200
+DEFAULT_SEARCH_LIMIT = 1000
+
+_index_cache = {}
+
+
+def _file_signature(file_path):
+    st = os.stat(file_path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _cache_path(file_path):
+    digest = hashlib.sha1(os.path.abspath(file_path).encode("utf-8")).hexdigest()
+    return os.path.join(INDEX_CACHE_DIR, digest + ".idx")
+
+
+def _scan_line_offsets(file_path, size):
+    """Returns an array of byte offsets at which each line of the file starts."""
+    offsets = array("Q")
+    if size == 0:
+        return offsets
+    offsets.append(0)
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        find = mm.find
+        pos = find(b"\n")
+        while pos != -1:
+            if pos + 1 < size:
+                offsets.append(pos + 1)
+            pos = find(b"\n", pos + 1)
+    return offsets
+
+
+def _load_cached_index(file_path, signature):
+    try:
+        with open(_cache_path(file_path), "rb") as f:
+            if f.readline() != INDEX_MAGIC:
+                return None
+            header = f.readline().decode("ascii").split()
+            if (int(header[0]), int(header[1])) != signature:
+                return None
+            offsets = array("Q")
+            offsets.frombytes(f.read())
+            return offsets
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _store_cached_index(file_path, signature, offsets):
+    try:
+        os.makedirs(INDEX_CACHE_DIR, exist_ok=True)
+        tmp_path = _cache_path(file_path) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(INDEX_MAGIC)
+            f.write(f"{signature[0]} {signature[1]}\n".encode("ascii"))
+            offsets.tofile(f)
+        os.replace(tmp_path, _cache_path(file_path))
+    except OSError as e:
+        # 缓存写入失败不影响读取，只是下次需要重新建立索引
+        print(f"Warning: could not cache line index for {file_path}: {e}", file=sys.stderr)
+
+
+def get_line_index(file_path):
+    """
+    返回文件的行起始偏移索引。
+    索引只在文件首次打开或内容变化（大小/修改时间不同）时建立，之后从内存或磁盘缓存读取。
+    """
+    signature = _file_signature(file_path)
+    key = os.path.abspath(file_path)
+    cached = _index_cache.get(key)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    offsets = _load_cached_index(file_path, signature)
+    if offsets is None:
+        offsets = _scan_line_offsets(file_path, signature[0])
+        _store_cached_index(file_path, signature, offsets)
+    _index_cache[key] = (signature, offsets)
+    return offsets
+
+
+class ResultFile:
+    """Paged, index-backed read access to a TestResult TXT file."""
+
+    def __init__(self, file_path, encoding="utf-8"):
+        self.file_path = file_path
+        self.encoding = encoding
+        self.offsets = get_line_index(file_path)
+        self.size = _file_signature(file_path)[0]
+        self._file = open(file_path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def line_count(self):
+        return len(self.offsets)
+
+    def _line_end(self, line_no):
+        if line_no + 1 < len(self.offsets):
+            return self.offsets[line_no + 1]
+        return self.size
+
+    def _decode(self, raw):
+        return raw.decode(self.encoding, errors="replace").rstrip("\r\n")
+
+    def read_lines(self, start, count=DEFAULT_PAGE_SIZE):
+        """Returns `count` lines beginning at zero-based line `start`."""
+        start = max(0, start)
+        stop = min(start + max(0, count), self.line_count)
+        if start >= stop:
+            return []
+        raw = self._mm[self.offsets[start]:self._line_end(stop - 1)]
+        return [self._decode(line) for line in raw.split(b"\n")[:stop - start]]
+
+    def read_page(self, page, page_size=DEFAULT_PAGE_SIZE):
+        """Returns zero-based page `page`; raises ValueError for a negative page or a non-positive page size."""
+        if page < 0:
+            raise ValueError(f"page must be >= 0, got {page}")
+        if page_size <= 0:
+            raise ValueError(f"page_size must be > 0, got {page_size}")
+        start = page * page_size
+        return {
+            "file": os.path.basename(self.file_path),
+            "total_lines": self.line_count,
+            "page": page,
+            "page_size": page_size,
+            "start": start,
+            "lines": self.read_lines(start, page_size),
+        }
+
+    def line_of_offset(self, offset):
+        return bisect.bisect_right(self.offsets, offset) - 1
+
+    def search(self, pattern, regex=False, ignore_case=False, limit=DEFAULT_SEARCH_LIMIT):
+        """
+        在整个文件中查找子串或正则表达式，返回命中行的行号和内容。
+        同一行多次命中只返回一次。
+        """
+        hits = []
+        if self._mm is None or not pattern:
+            return hits
+
+        needle = pattern.encode(self.encoding)
+        if regex or ignore_case:
+            flags = re.IGNORECASE if ignore_case else 0
+            compiled = re.compile(needle if regex else re.escape(needle), flags | re.MULTILINE)
+            positions = (m.start() for m in compiled.finditer(self._mm))
+        else:
+            positions = self._find_all(needle)
+
+        last_line = -1
+        for pos in positions:
+            line_no = self.line_of_offset(pos)
+            if line_no == last_line:
+                continue
+            last_line = line_no
+            raw = self._mm[self.offsets[line_no]:self._line_end(line_no)]
+            hits.append({"line": line_no, "text": self._decode(raw)})
+            if len(hits) >= limit:
+                break
+        return hits
+
+    def _find_all(self, needle):
+        find = self._mm.find
+        pos = find(needle)
+        while pos != -1:
+            yield pos
+            # 跳到当前行末尾，避免同一行重复命中
+            pos = find(needle, self._line_end(self.line_of_offset(pos)))
+
+
+def _usage():
+    print("Usage: python result_reader.py <result_txt> info\n"
+          "       python result_reader.py <result_txt> page <page> [page_size]\n"
+          "       python result_reader.py <result_txt> lines <start> <count>\n"
+          "       python result_reader.py <result_txt> search <pattern> [--regex] [--ignore-case] [--limit N]",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        _usage()
+        sys.exit(1)
+
+    file_path, command, args = sys.argv[1], sys.argv[2], sys.argv[3:]
+    try:
+        with ResultFile(file_path) as result:
+            if command == "info":
+                output = {"file": os.path.basename(file_path), "total_lines": result.line_count, "size": result.size}
+            elif command == "page":
+                page_size = int(args[1]) if len(args) > 1 else DEFAULT_PAGE_SIZE
+                output = result.read_page(int(args[0]), page_size)
+            elif command == "lines":
+                start, count = int(args[0]), int(args[1])
+                output = {"total_lines": result.line_count, "start": start, "lines": result.read_lines(start, count)}
+            elif command == "search":
+                limit = int(args[args.index("--limit") + 1]) if "--limit" in args else DEFAULT_SEARCH_LIMIT
+                hits = result.search(args[0], regex="--regex" in args,
+                                     ignore_case="--ignore-case" in args, limit=limit)
+                output = {"total_lines": result.line_count, "pattern": args[0], "hits": hits}
+            else:
+                _usage()
+                sys.exit(1)
+        print(json.dumps(output))
+    except (IndexError, ValueError, re.error) as e:
+        print(f"Invalid arguments: {e}", file=sys.stderr)
+        _usage()
+        sys.exit(1)
+    except OSError as e:
+        print(f"Error reading result file {file_path}: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,109 @@
+import numpy as np
+
+DEFAULT_PRECISION = 3
+# 各细节层级的抽稀网格边长（mm），0 表示全部引脚
+DEFAULT_LOD_CELLS = (0.0, 0.5, 2.0)
+
+
+def _quantize(values, precision):
+    return np.rint(np.asarray(values, dtype=np.float64) * 10 ** precision).astype(np.int64)
+
+
+def _format_fixed(quantized, precision):
+    """
+    Formats integers scaled by 10**precision as short decimal strings:
+    trailing zeros and a leading "0" are dropped (1500 -> "1.5", -250 -> "-.25").
+    """
+    scale = 10 ** precision
+    out = []
+    for q in quantized.tolist():
+        sign = "-" if q < 0 else ""
+        whole, frac = divmod(abs(q), scale)
+        frac_text = f"{frac:0{precision}d}".rstrip("0") if frac else ""
+        if frac_text:
+            out.append(f"{sign}{whole if whole else ''}.{frac_text}")
+        else:
+            out.append(f"{sign}{whole}")
+    return out
+
+
+def _pair(dx, dy):
+    # 负号本身可以作为分隔符，省去空格
+    return dx + dy if dy.startswith("-") else dx + " " + dy
+
+
+def decimate(xy, cell):
+    """Keeps the first point of every grid cell of size `cell`; returns indexes into xy."""
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    if cell <= 0 or len(xy) == 0:
+        return np.arange(len(xy))
+    cells = np.floor((xy - xy.min(axis=0)) / cell).astype(np.int64)
+    _, keep = np.unique(cells, axis=0, return_index=True)
+    return np.sort(keep)
+
+
+def pin_path(xy, precision=DEFAULT_PRECISION):
+    """
+    把一组引脚编码成一个SVG path：每个引脚是一段零长度的相对子路径 `m dx dy h0`，
+    渲染时使用 stroke-linecap="round"、stroke-width=引脚直径即可画成圆点。
+    相对坐标由整数化后的绝对坐标求差得到，不会累积误差。
+    """
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    if len(xy) == 0:
+        return ""
+    q = _quantize(xy, precision)
+    deltas = np.diff(q, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    xs = _format_fixed(deltas[:, 0], precision)
+    ys = _format_fixed(deltas[:, 1], precision)
+    return "".join(f"m{_pair(dx, dy)}h0" for dx, dy in zip(xs, ys))
+
+
+def outline_path(coords, precision=DEFAULT_PRECISION):
+    """Encodes one outline as `M x y l dx dy ...` with fixed precision; closed outlines end with Z."""
+    q = _quantize(np.asarray(coords, dtype=np.float64).reshape(-1, 2), precision)
+    if len(q) == 0:
+        return ""
+    closed = len(q) > 2 and (q[0] == q[-1]).all()
+    if closed:
+        q = q[:-1]
+    head_x, head_y = _format_fixed(q[0], precision)
+    parts = [f"M{_pair(head_x, head_y)}"]
+    if len(q) > 1:
+        deltas = np.diff(q, axis=0)
+        xs = _format_fixed(deltas[:, 0], precision)
+        ys = _format_fixed(deltas[:, 1], precision)
+        parts.append("l" + " ".join(_pair(dx, dy) for dx, dy in zip(xs, ys)))
+    if closed:
+        parts.append("Z")
+    return "".join(parts)
+
+
+def build_svg_payload(units, pin_table=None, precision=DEFAULT_PRECISION, lod_cells=DEFAULT_LOD_CELLS):
+    """
+    生成可直接渲染的几何数据：每面、每个细节层级一个引脚path，每个RUT单元一个轮廓path，以及数据边界。
+    高亮引脚由渲染端按编号从 adr_data 取坐标单独绘制为覆盖层。
+    """
+    payload = {'precision': precision, 'linecap': 'round', 'pins': {}, 'outlines': []}
+    points = []
+
+    for filename, coords in units:
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        payload['outlines'].append({'filename': filename, 'd': outline_path(coords, precision)})
+        points.append(coords)
+
+    if pin_table is not None:
+        for side, key in (("A", "side_a"), ("B", "side_b")):
+            xy = pin_table.for_side(side).xy
+            points.append(xy)
+            levels = []
+            for cell in lod_cells:
+                keep = decimate(xy, cell)
+                levels.append({'cell': cell, 'count': int(len(keep)), 'd': pin_path(xy[keep], precision)})
+            payload['pins'][key] = levels
+
+    points = [p for p in points if len(p)]
+    if points:
+        stacked = np.concatenate(points)
+        (min_x, min_y), (max_x, max_y) = stacked.min(axis=0).tolist(), stacked.max(axis=0).tolist()
+        payload['bounds'] = {'minX': min_x, 'minY': min_y, 'maxX': max_x, 'maxY': max_y}
+    return payload
@@ -0,0 +1,432 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import datetime
+import threading
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_CHUNK_SIZE = 1024
+END_TAG = b"</TestResult>"
+
+ERROR_TYPES = ("SPARK", "WRu-SHORT")
+# 与 app/main/doc_test/NGLog-*.csv 相同的表头
+CSV_HEADER = '"Date","Lot","Serial","Dut","BlockX","BlockY","Item","Pin1","Pin2","No.","Point","Result","Meas","Error"\n'
+# TestResult TXT 中各测试项所在的段名（SPARK 归在 LEAK 段下）
+RESULT_SECTIONS = {"SPARK": "LEAK", "WRu-SHORT": "WRu-SHORT"}
+SPARK_TEXT = "[spark retry detection]"
+MONTHS = ("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC")
+# data/test.xml 中 State/Fixture 的基准标记位置
+DEFAULT_MARKS = {"TopFixture": ("0,-32.5", "0,32.5"), "BottomFixture": ("0,-33.1", "0,33.1")}
+
+
+def _timestamp(moment):
+    return moment.strftime("%Y%m%d-%H%M%S")
+
+
+def write_block_logs(out_dir, moment, pins, fail_count, rng, block_x=1, block_y=1, serial=1):
+    """
+    生成一对日志，格式与 app/main/doc_test 中的样本相同：
+    NGLog-<时间戳>.csv（parse_fails 读取 Item/Pin1/Pin2 列）和 TestResult-<时间戳>.txt
+    （<< BLOCK JUDGE >> 块头，按测试项分段的 << ... FAIL >> 列表）。时间戳在整个语料中唯一，保证渲染端按时间戳配对正确。
+    """
+    stamp = _timestamp(moment)
+    csv_path = os.path.join(out_dir, f"NGLog-{stamp}.csv")
+    txt_path = os.path.join(out_dir, f"TestResult-{stamp}.txt")
+    rows = []
+    for _ in range(fail_count):
+        item = rng.choice(ERROR_TYPES)
+        pin1 = rng.choice(pins)
+        if item == "SPARK":
+            rows.append((item, pin1, "", None))
+        else:
+            rows.append((item, pin1, rng.choice(pins), rng.uniform(1.0, 50.0)))
+
+    date = moment.strftime("%Y/%m/%d %H:%M:%S")
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        f.write(CSV_HEADER)
+        for item, pin1, pin2, kohm in rows:
+            prefix = f"{date},1,{serial},1,{block_x},{block_y},{item},{pin1},{pin2},,"
+            if kohm is None:
+                f.write(f'{prefix}"{pin1}",{SPARK_TEXT},,{SPARK_TEXT}\n')
+            else:
+                f.write(f'{prefix}"{pin1:<8}- {pin2}",{kohm:.1f}k,{kohm:.2f},\n')
+
+    with open(txt_path, "w", encoding="utf-8", newline="") as f:
+        f.write("==============================\n[Test-1]\n")
+        if rows:
+            f.write(f"<< BLOCK JUDGE (B) >>\n L\n<< BLOCK DIVXY [{block_x},{block_y}] >>\n[Test-1]\n")
+        for item in ERROR_TYPES:
+            section = [row for row in rows if row[0] == item]
+            if not section:
+                continue
+            name = RESULT_SECTIONS[item]
+            f.write(f"<< {name} FAIL >>\n")
+            for _, pin1, pin2, kohm in section:
+                if kohm is None:
+                    f.write(f"   {pin1}    {SPARK_TEXT}\n")
+                else:
+                    f.write(f"   {pin1:<8}- {pin2:<8}{kohm:.1f}kohm\n")
+            f.write(f"{name} - FAIL [{len(section):>3}]\n")
+        f.write(f"DATE: {moment.day:02d}-{MONTHS[moment.month - 1]}-{moment.year} {moment:%H:%M}\n")
+    return csv_path, txt_path, len(rows)
+
+
+def build_test_result_xml(jig, lot, blocks, marks=None):
+    """
+    Builds a TestResult message in the layout of data/test.xml, including the State/Fixture
+    correction marks read by transform.read_correction_marks (`marks` defaults to DEFAULT_MARKS).
+    `blocks` are dicts with block_x, block_y, panel_id, serial, result, path and result_path.
+    """
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<TestResult>\n',
+             "    <State>\n        <AutoRunMode>Y</AutoRunMode>\n",
+             f"        <Recipe>{escape(jig)}.gts</Recipe>\n        <LotID>{escape(lot)}</LotID>\n",
+             f"        <JigName>{escape(jig)}</JigName>\n        <Fixture>\n"]
+    for tag, positions in (marks or DEFAULT_MARKS).items():
+        parts.append(f"            <{tag}>\n                <JIGModel>{escape(jig)}</JIGModel>\n")
+        parts.extend(f"                <CorrectionMarkPosition{n}>{escape(position)}</CorrectionMarkPosition{n}>\n"
+                     for n, position in enumerate(positions, 1))
+        parts.append(f"            </{tag}>\n")
+    parts.append("        </Fixture>\n    </State>\n")
+    for block in blocks:
+        parts.append(
+            "    <BlockTestComplete>\n        <AutoRunMode>0</AutoRunMode>\n"
+            f"        <Recipe>{escape(jig)}.gts</Recipe>\n        <LotID>{escape(lot)}</LotID>\n"
+            f"        <BlockX>{block['block_x']}</BlockX>\n        <BlockY>{block['block_y']}</BlockY>\n"
+            f"        <PanelID>{escape(str(block['panel_id']))}</PanelID>\n"
+            f"        <Serial>{block['serial']}</Serial>\n        <Result>{block['result']}</Result>\n"
+            f"        <Path>{escape(block['path'])}</Path>\n"
+            f"        <ResultPath>{escape(block['result_path'])}</ResultPath>\n"
+            "    </BlockTestComplete>\n")
+    parts.append("</TestResult>")
+    return "".join(parts)
+
+
+def generate_corpus(out_dir, messages=100, grid=(2, 2), pins=None, fail_rate=0.001, max_fails=None,
+                    jig="G8360-TEST", lot="SIM", seed=1, start=None):
+    """
+    生成回放语料：每条消息对应一块拼板（grid 个Block），每个Block一对NG日志和测试结果文件，
+    路径为本地绝对路径。pins 为可选的引脚编号列表（例如来自ADR），默认 1..20000。
+    返回并写出 corpus.json：[{'id', 'xml', 'files'}]。
+    """
+    out_dir = os.path.abspath(out_dir)
+    logs_dir = os.path.join(out_dir, "logs")
+    os.makedirs(logs_dir, exist_ok=True)
+    rng = random.Random(seed)
+    pins = list(pins) if pins is not None else list(range(1, 20001))
+    moment = start or datetime.datetime(2025, 1, 1, 8, 0, 0)
+    columns, rows = grid
+
+    corpus = []
+    serial = 0
+    for message_id in range(messages):
+        blocks, files = [], []
+        for by in range(1, rows + 1):
+            for bx in range(1, columns + 1):
+                serial += 1
+                # 每块一秒，时间戳全局唯一
+                moment += datetime.timedelta(seconds=1)
+                expected = len(pins) * fail_rate
+                fail_count = min(int(rng.expovariate(1.0 / expected)) if expected > 0 else 0,
+                                 max_fails if max_fails is not None else len(pins))
+                csv_path, txt_path, count = write_block_logs(logs_dir, moment, pins, fail_count, rng, bx, by, serial)
+                blocks.append({'block_x': bx, 'block_y': by, 'panel_id': message_id + 1, 'serial': serial,
+                               'result': 'NG' if count else 'OK', 'path': csv_path, 'result_path': txt_path})
+                files.extend((csv_path, txt_path))
+        corpus.append({'id': message_id, 'xml': build_test_result_xml(jig, lot, blocks), 'files': files})
+
+    with open(os.path.join(out_dir, "corpus.json"), "w", encoding="utf-8") as f:
+        json.dump(corpus, f)
+    return corpus
+
+
+def load_corpus(out_dir):
+    with open(os.path.join(out_dir, "corpus.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+class IngestMonitor:
+    """
+    监视服务端的接收目录（tcp_handler 把 Path/ResultPath 复制到 doc_test），
+    记录每个预期文件首次完整出现的时间，用于计算端到端延迟。
+    语料文件名固定，目录中可能留有上一轮的同名文件：expect() 记下它们当时的 (inode, mtime, size)，
+    只有签名变化（被重新写入或替换）后的文件才算到达。
+    """
+
+    def __init__(self, ingest_dir, interval=0.01):
+        self.ingest_dir = ingest_dir
+        self.interval = interval
+        self.expected = {}
+        self.stale = {}
+        self.seen = {}
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def _signature(st):
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def expect(self, files):
+        with self.lock:
+            for path in files:
+                name = os.path.basename(path)
+                self.expected[name] = os.path.getsize(path)
+                self.seen.pop(name, None)
+                try:
+                    self.stale[name] = self._signature(os.stat(os.path.join(self.ingest_dir, name)))
+                except OSError:
+                    self.stale.pop(name, None)
+
+    def _run(self):
+        while not self.stopping.is_set():
+            try:
+                entries = list(os.scandir(self.ingest_dir))
+            except OSError:
+                entries = []
+            now = time.perf_counter()
+            with self.lock:
+                for entry in entries:
+                    size = self.expected.get(entry.name)
+                    if size is not None and entry.name not in self.seen:
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        if st.st_size >= size and self._signature(st) != self.stale.get(entry.name):
+                            self.seen[entry.name] = now
+            time.sleep(self.interval)
+
+    def arrival(self, files):
+        """Time when the last of `files` appeared, or None if any is still missing."""
+        with self.lock:
+            times = [self.seen.get(os.path.basename(path)) for path in files]
+        return None if None in times else max(times)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+
+
+def _tester(tester_id, host, port, messages, rate, chunk_size, chunk_delay, monitor, results):
+    """One fake tester: a persistent TCP connection sending its messages at `rate` per second, in chunks."""
+    try:
+        connection = socket.create_connection((host, port), timeout=10)
+    except OSError as e:
+        results.extend({'tester': tester_id, 'id': m['id'], 'error': str(e)} for m in messages)
+        return
+
+    interval = 1.0 / rate if rate else 0.0
+    began = time.perf_counter()
+    with connection:
+        for sequence, message in enumerate(messages):
+            delay = began + sequence * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            payload = message['xml'].encode("utf-8")
+            if monitor:
+                monitor.expect(message['files'])
+            record = {'tester': tester_id, 'id': message['id'], 'bytes': len(payload), 'start': time.perf_counter()}
+            try:
+                for offset in range(0, len(payload), chunk_size):
+                    connection.sendall(payload[offset:offset + chunk_size])
+                    if chunk_delay:
+                        time.sleep(chunk_delay)
+            except OSError as e:
+                record['error'] = str(e)
+                results.append(record)
+                break
+            record['sent'] = time.perf_counter()
+            results.append(record)
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def replay(corpus, host=DEFAULT_HOST, port=DEFAULT_PORT, testers=4, rate=1.0, chunk_size=DEFAULT_CHUNK_SIZE,
+           chunk_delay=0.0, ingest_dir=None, timeout=30.0):
+    """
+    用 testers 个并发模拟测试机（每个一条TCP连接）回放语料，消息轮流分配给各测试机，
+    每台按 rate 条/秒发送，每条消息按 chunk_size 字节分片（可选分片间隔 chunk_delay 秒）。
+    给出 ingest_dir 时等待服务端复制出全部文件，统计端到端延迟；返回统计报告。
+    """
+    monitor = IngestMonitor(ingest_dir) if ingest_dir else None
+    if monitor:
+        monitor.start()
+
+    results = []
+    threads = []
+    began = time.perf_counter()
+    for tester_id in range(testers):
+        assigned = corpus[tester_id::testers]
+        thread = threading.Thread(target=_tester, args=(tester_id, host, port, assigned, rate, chunk_size,
+                                                        chunk_delay, monitor, results))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    send_seconds = time.perf_counter() - began
+
+    by_id = {message['id']: message for message in corpus}
+    sent = [r for r in results if 'error' not in r]
+    report = {
+        'testers': testers, 'rate_per_tester': rate, 'chunk_size': chunk_size, 'chunk_delay': chunk_delay,
+        'messages': len(corpus), 'sent': len(sent), 'send_errors': len(results) - len(sent),
+        'bytes': sum(r['bytes'] for r in sent), 'send_seconds': round(send_seconds, 3),
+        'send_throughput_msgs': round(len(sent) / send_seconds, 2) if send_seconds else None,
+    }
+    errors = sorted({r['error'] for r in results if 'error' in r})
+    if errors:
+        report['errors'] = errors[:10]
+
+    if monitor:
+        deadline = time.perf_counter() + timeout
+        pending = list(sent)
+        while pending and time.perf_counter() < deadline:
+            pending = [r for r in pending if monitor.arrival(by_id[r['id']]['files']) is None]
+            time.sleep(0.05)
+        monitor.stop()
+        latencies = []
+        last_arrival = None
+        for record in sent:
+            arrival = monitor.arrival(by_id[record['id']]['files'])
+            if arrival is not None:
+                latencies.append(arrival - record['sent'])
+                last_arrival = arrival if last_arrival is None else max(last_arrival, arrival)
+        total = (last_arrival - began) if last_arrival else None
+        report.update({
+            'ingested': len(latencies), 'missing': len(sent) - len(latencies),
+            'ingest_seconds': round(total, 3) if total else None,
+            'ingest_throughput_msgs': round(len(latencies) / total, 2) if total else None,
+            'latency_ms': {name: round(value * 1000, 1) if value is not None else None
+                           for name, value in (('p50', _percentile(latencies, 0.5)),
+                                               ('p95', _percentile(latencies, 0.95)),
+                                               ('p99', _percentile(latencies, 0.99)),
+                                               ('max', max(latencies) if latencies else None))},
+        })
+    return report
+
+
+def run_sink(host, port, ingest_dir, parse=False, stop_event=None):
+    """
+    本地接收端，行为与 app/main/tcp_handler.js 相同：按 </TestResult> 切分缓冲区、解析XML，
+    把 Path/ResultPath 复制到 ingest_dir。parse 为 True 时复制前先用 parse_fails 解析NG日志，
+    以便把失败解析的开销计入端到端延迟。用于在没有Electron的环境中压测。
+    """
+    if parse:
+        from parse_fails import parse_fail_log
+    os.makedirs(ingest_dir, exist_ok=True)
+    server = socket.create_server((host, port))
+    server.settimeout(0.2)
+
+    def handle(connection):
+        buffer = b""
+        with connection:
+            while True:
+                try:
+                    data = connection.recv(65536)
+                except OSError:
+                    return
+                if not data:
+                    return
+                buffer += data
+                while END_TAG in buffer:
+                    end = buffer.index(END_TAG) + len(END_TAG)
+                    message, buffer = buffer[:end], buffer[end:]
+                    if not message.strip().startswith(b"<?xml"):
+                        continue
+                    try:
+                        root = ET.fromstring(message)
+                    except ET.ParseError as e:
+                        print(f"XML parsing error: {e}", file=sys.stderr)
+                        continue
+                    for block in root.iter("BlockTestComplete"):
+                        if parse and block.findtext("Path"):
+                            parse_fail_log(block.findtext("Path"))
+                        for tag in ("Path", "ResultPath"):
+                            source = block.findtext(tag)
+                            if source and os.path.exists(source):
+                                # 先写临时名再改名，监视端不会看到写了一半的文件
+                                target = os.path.join(ingest_dir, os.path.basename(source))
+                                shutil.copyfile(source, target + ".part")
+                                os.replace(target + ".part", target)
+
+    with server:
+        while not (stop_event and stop_event.is_set()):
+            try:
+                connection, _ = server.accept()
+            except socket.timeout:
+                continue
+            threading.Thread(target=handle, args=(connection,), daemon=True).start()
+
+
+def _options(args, flags=()):
+    options = {}
+    positional = []
+    items = iter(args)
+    for arg in items:
+        if arg in flags:
+            options[arg] = True
+        elif arg.startswith("--"):
+            options[arg] = next(items, None)
+        else:
+            positional.append(arg)
+    return positional, options
+
+
+USAGE = """Usage: python tester_sim.py generate <out_dir> [--messages 100] [--grid 2x2] [--adr file] [--fail-rate 0.001] [--seed 1]
+       python tester_sim.py replay <out_dir> [--host 127.0.0.1] [--port 8080] [--testers 4] [--rate 1]
+                                   [--chunk 1024] [--chunk-delay 0] [--ingest-dir app/main/doc_test] [--timeout 30]
+       python tester_sim.py sink --ingest-dir <dir> [--host 127.0.0.1] [--port 8080] [--parse]"""
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("generate", "replay", "sink"):
+        print(USAGE, file=sys.stderr)
+        sys.exit(1)
+
+    command = sys.argv[1]
+    positional, options = _options(sys.argv[2:], flags=("--parse",))
+    if command == "sink":
+        if not options.get("--ingest-dir"):
+            print(USAGE, file=sys.stderr)
+            sys.exit(1)
+        try:
+            run_sink(options.get("--host", DEFAULT_HOST), int(options.get("--port", DEFAULT_PORT)),
+                     options["--ingest-dir"], parse="--parse" in options)
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
+    if not positional:
+        print(USAGE, file=sys.stderr)
+        sys.exit(1)
+    if command == "generate":
+        pins = None
+        if options.get("--adr"):
+            from pin_table import read_pin_table
+            pins = read_pin_table(options["--adr"]).no.tolist()
+        columns, rows = (int(v) for v in options.get("--grid", "2x2").lower().split("x"))
+        corpus = generate_corpus(positional[0], int(options.get("--messages", 100)), (columns, rows), pins,
+                                 float(options.get("--fail-rate", 0.001)), seed=int(options.get("--seed", 1)))
+        print(json.dumps({'messages': len(corpus), 'files': sum(len(m['files']) for m in corpus)}))
+    else:
+        report = replay(load_corpus(positional[0]), options.get("--host", DEFAULT_HOST),
+                        int(options.get("--port", DEFAULT_PORT)), int(options.get("--testers", 4)),
+                        float(options.get("--rate", 1.0)), int(options.get("--chunk", DEFAULT_CHUNK_SIZE)),
+                        float(options.get("--chunk-delay", 0.0)), options.get("--ingest-dir"),
+                        float(options.get("--timeout", 30.0)))
+        print(json.dumps(report))
@@ -0,0 +1,138 @@
+import re
+import xml.etree.ElementTree as ET
+import numpy as np
+
+# ADR中的A面引脚对应上治具（TOP），B面对应下治具（BOT）
+SIDE_FIXTURE = {"A": "top", "B": "bottom"}
+FIXTURE_TAGS = {"top": "TopFixture", "bottom": "BottomFixture"}
+
+
+def identity():
+    return np.eye(3)
+
+
+def translation(dx, dy):
+    m = np.eye(3)
+    m[0, 2] = dx
+    m[1, 2] = dy
+    return m
+
+
+def mirror_x():
+    """Mirrors about the Y axis, i.e. (x, y) -> (-x, y), as done for TOP outlines."""
+    return np.diag([-1.0, 1.0, 1.0])
+
+
+def compose(*matrices):
+    """Composes 3x3 homogeneous transforms; the first argument is applied first."""
+    result = np.eye(3)
+    for m in matrices:
+        result = m @ result
+    return result
+
+
+def apply_transform(matrix, xy):
+    """Applies one 3x3 homogeneous transform to an (N, 2) coordinate array."""
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    return xy @ matrix[:2, :2].T + matrix[:2, 2]
+
+
+def apply_transforms(matrices, index, xy):
+    """
+    批量变换：`matrices` 为 (K, 3, 3) 的变换栈，`index` 为每个点所用变换的下标。
+    所有点在一次向量化运算中完成变换，适合把不同单元/不同面的点拼在一起统一处理。
+    """
+    matrices = np.asarray(matrices, dtype=np.float64)
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    linear = matrices[index, :2, :2]
+    offset = matrices[index, :2, 2]
+    return np.einsum("nij,nj->ni", linear, xy) + offset
+
+
+def fit_similarity(src, dst):
+    """
+    Least-squares similarity transform (rotation, uniform scale, translation) mapping src onto dst.
+    Needs at least two distinct points; with exactly two marks the fit is exact.
+    """
+    src = np.asarray(src, dtype=np.float64).reshape(-1, 2)
+    dst = np.asarray(dst, dtype=np.float64).reshape(-1, 2)
+    if len(src) != len(dst) or len(src) < 2:
+        raise ValueError("Similarity fit needs at least two matching mark pairs")
+
+    # 用复数表示平面点: dst = a * src + b
+    zs = src[:, 0] + 1j * src[:, 1]
+    zd = dst[:, 0] + 1j * dst[:, 1]
+    cs, cd = zs.mean(), zd.mean()
+    denom = np.sum(np.abs(zs - cs) ** 2)
+    if denom == 0:
+        raise ValueError("Correction marks coincide")
+    a = np.sum(np.conj(zs - cs) * (zd - cd)) / denom
+    b = cd - a * cs
+    return np.array([[a.real, -a.imag, b.real],
+                     [a.imag, a.real, b.imag],
+                     [0.0, 0.0, 1.0]])
+
+
+def fit_affine(src, dst):
+    """Least-squares affine transform mapping src onto dst. Needs at least three non-collinear points."""
+    src = np.asarray(src, dtype=np.float64).reshape(-1, 2)
+    dst = np.asarray(dst, dtype=np.float64).reshape(-1, 2)
+    if len(src) != len(dst) or len(src) < 3:
+        raise ValueError("Affine fit needs at least three matching mark pairs")
+    a = np.column_stack((src, np.ones(len(src))))
+    solution, _, rank, _ = np.linalg.lstsq(a, dst, rcond=None)
+    if rank < 3:
+        raise ValueError("Correction marks are collinear")
+    m = np.eye(3)
+    m[:2, :] = solution.T
+    return m
+
+
+def fit_transform(src, dst, kind="similarity"):
+    if kind == "similarity":
+        return fit_similarity(src, dst)
+    if kind == "affine":
+        return fit_affine(src, dst)
+    raise ValueError(f"Unknown transform kind: {kind}")
+
+
+def parse_mark_list(text):
+    """Parses marks given as `x1,y1;x2,y2;...` into an (N, 2) array."""
+    marks = [tuple(float(v) for v in item.split(",")) for item in text.split(";") if item.strip()]
+    if any(len(m) != 2 for m in marks):
+        raise ValueError(f"Invalid mark list: {text}")
+    return np.array(marks, dtype=np.float64).reshape(-1, 2)
+
+
+def read_correction_marks(xml_source):
+    """
+    从TestResult XML的 State/Fixture 中读取 CorrectionMarkPosition1/2/... 。
+    `xml_source` 可以是文件路径或XML字符串；返回 {'top': array, 'bottom': array}，缺失的治具不出现在结果中。
+    """
+    if xml_source.lstrip().startswith("<"):
+        root = ET.fromstring(xml_source)
+    else:
+        root = ET.parse(xml_source).getroot()
+
+    marks = {}
+    for fixture, tag in FIXTURE_TAGS.items():
+        node = root.find(f".//Fixture/{tag}")
+        if node is None:
+            continue
+        numbered = []
+        for child in node:
+            match = re.fullmatch(r"CorrectionMarkPosition(\d+)", child.tag)
+            if match and child.text:
+                numbered.append((int(match.group(1)), child.text.strip()))
+        if numbered:
+            numbered.sort()
+            marks[fixture] = parse_mark_list(";".join(text for _, text in numbered))
+    return marks
+
+
+def alignment_from_marks(design_marks, measured_marks, kind="similarity"):
+    """
+    为每个治具计算把设计坐标对齐到实测基准标记的变换。
+    `design_marks` 是显示坐标系（镜像/偏移之后）中的标记设计位置，`measured_marks` 为 read_correction_marks 的结果。
+    """
+    return {fixture: fit_transform(design_marks, marks, kind) for fixture, marks in measured_marks.items()}
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROOT, "app", "python"))
+
+FIXTURE_DIR = os.path.join(ROOT, "test", "fixtures", "rut")
+
+
+@pytest.fixture
+def fixture_path():
+    """Absolute path of a file in test/fixtures/rut."""
+    def resolve(name):
+        path = os.path.join(FIXTURE_DIR, name)
+        if not os.path.exists(path):
+            pytest.skip(f"fixture {name} not available")
+        return path
+    return resolve
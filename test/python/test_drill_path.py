@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+import drill_path
+
+
+def _cases():
+    rng = np.random.default_rng(5)
+    uniform = rng.uniform(0, 5, (300, 2))
+    grid = np.round(rng.uniform(0, 5, (300, 2)), 1)
+    duplicates = uniform.copy()
+    duplicates[:150] = duplicates[0]
+    line = uniform.copy()
+    line[:, 1] = 0.0
+    cluster = np.vstack((rng.normal(0, 0.01, (250, 2)), rng.uniform(50, 60, (50, 2))))
+    return {'uniform': uniform, 'grid': grid, 'duplicates': duplicates, 'line': line, 'cluster': cluster}
+
+
+CASES = _cases()
+
+
+def _distances(xy):
+    d = np.hypot(*(xy[:, None, :] - xy[None, :, :]).transpose(2, 0, 1))
+    np.fill_diagonal(d, np.inf)
+    return d
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_nearest_neighbours_match_brute_force(name):
+    xy = CASES[name]
+    d = _distances(xy)
+    neighbours = drill_path.nearest_neighbours(xy, 8)
+    for i, row in enumerate(neighbours):
+        assert len(row) == 8 and i not in row
+        assert np.allclose(d[i][row], np.sort(d[i])[:8], rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_nearest_neighbour_order_is_greedy(name):
+    xy = CASES[name]
+    order = drill_path.nearest_neighbour_order(xy, (0.0, 0.0))
+    assert sorted(order.tolist()) == list(range(len(xy)))
+    remaining = np.ones(len(xy), dtype=bool)
+    position = np.zeros(2)
+    for idx in order.tolist():
+        step = np.hypot(*(xy[remaining] - position).T).min()
+        assert np.hypot(*(xy[idx] - position)) == pytest.approx(step, abs=1e-12)
+        remaining[idx] = False
+        position = xy[idx]
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_improve_order_is_a_shorter_permutation(name):
+    xy = CASES[name]
+    start = (-1.0, -1.0)
+    order = drill_path.nearest_neighbour_order(xy, start)
+    improved = drill_path.improve_order(order, xy, start, time_budget=5.0)
+    assert sorted(improved.tolist()) == list(range(len(xy)))
+    assert drill_path.path_length(xy[improved], start) <= drill_path.path_length(xy[order], start) + 1e-9
+
+
+def test_improve_order_fixes_a_crossed_path():
+    # 0-2-1-3 在中间交叉，2-opt 应把它理顺为直线顺序
+    xy = np.array([[0.0, 0.0], [2.0, 0.0], [1.0, 0.0], [3.0, 0.0]])
+    improved = drill_path.improve_order(np.array([0, 1, 2, 3]), xy, (0.0, 0.0), time_budget=1.0)
+    assert drill_path.path_length(xy[improved]) == pytest.approx(3.0)
+
+
+def test_or_opt_moves_a_stray_hole():
+    # 孔 5 被放在路径末尾，Or-opt 把它移回两个相邻孔之间
+    xy = np.array([[k, 0.0] for k in range(5)] + [[2.5, 0.0]])
+    improved = drill_path.improve_order(np.array([0, 1, 2, 3, 4, 5]), xy, (0.0, 0.0), time_budget=1.0)
+    assert drill_path.path_length(xy[improved]) == pytest.approx(4.0)
+
+
+def test_plan_drill_path_report():
+    xy = CASES['uniform']
+    order, report = drill_path.plan_drill_path(xy, time_budget=2.0)
+    assert sorted(order.tolist()) == list(range(len(xy)))
+    assert report['holes'] == len(xy)
+    assert report['travel_after'] <= report['travel_nearest_neighbour'] <= report['travel_before']
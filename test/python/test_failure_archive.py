@@ -0,0 +1,86 @@
+import datetime
+import sqlite3
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from failure_archive import pack_pins, unpack_pins, compact, iter_failures, archive_stats
+
+# 与 app/main/background.js 中的 failures 表相同
+FAILURES_SCHEMA = """
+CREATE TABLE failures (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  pin_number INTEGER NOT NULL,
+  error_type TEXT,
+  log_file TEXT NOT NULL,
+  timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+@pytest.mark.parametrize("pins", [[], [7], [5, 5, 5], [3, 1, 2], [0, 255], [0, 256], [10, 70000], [1, 2 ** 40]])
+def test_pack_unpack_round_trip(pins):
+    base_pin, width, data = pack_pins(pins)
+    assert unpack_pins(base_pin, width, data).tolist() == sorted(pins)
+
+
+def test_pack_uses_narrowest_width():
+    assert pack_pins([100, 355])[1] == 1
+    assert pack_pins([100, 356])[1] == 2
+    assert pack_pins([0, 2 ** 16])[1] == 4
+
+
+def _make_db(path, rows):
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute(FAILURES_SCHEMA)
+        connection.executemany("INSERT INTO failures (pin_number, error_type, log_file, timestamp) VALUES (?, ?, ?, ?)",
+                               rows)
+    connection.close()
+
+
+def _random_rows(seed, count=3000):
+    rng = np.random.default_rng(seed)
+    start = datetime.datetime(2025, 1, 1)
+    rows = []
+    for _ in range(count):
+        moment = start + datetime.timedelta(minutes=int(rng.integers(0, 60 * 24 * 300)))
+        rows.append((int(rng.integers(1, 70000)), str(rng.choice(["OPEN", "SHORT", "SPARK"])),
+                     f"NGLog-{rng.integers(0, 20):02d}.csv", moment.strftime("%Y-%m-%d %H:%M:%S")))
+    return rows
+
+
+def test_compact_preserves_every_failure(tmp_path):
+    db = str(tmp_path / "jig_data.db")
+    _make_db(db, _random_rows(0))
+    before = Counter(iter_failures(db))
+    moved = compact(db, keep_months=3, today=datetime.date(2025, 10, 15))
+    assert sum(moved.values()) > 0
+    assert max(moved) < "2025-07"
+    assert Counter(iter_failures(db)) == before
+
+    stats = archive_stats(db)
+    assert stats['live_rows'] + stats['archived_rows'] == sum(before.values())
+
+    # 重复压缩（例如导入了旧日志后）会与已有归档块合并，不丢也不重复
+    connection = sqlite3.connect(db)
+    with connection:
+        connection.execute("INSERT INTO failures (pin_number, error_type, log_file, timestamp) VALUES (?, ?, ?, ?)",
+                           (42, "OPEN", "NGLog-00.csv", "2025-02-03 04:05:06"))
+    connection.close()
+    before[(42, "OPEN", "NGLog-00.csv", "2025-02")] += 1
+    compact(db, keep_months=3, today=datetime.date(2025, 10, 15))
+    assert Counter(iter_failures(db)) == before
+
+
+def test_iter_failures_filters_apply_to_archive(tmp_path):
+    db = str(tmp_path / "jig_data.db")
+    rows = _random_rows(1)
+    _make_db(db, rows)
+    compact(db, keep_months=3, today=datetime.date(2025, 10, 15))
+    pins = {row[0] for row in rows[:50]}
+    expected = Counter((pin, error, log, stamp[:7]) for pin, error, log, stamp in rows
+                       if pin in pins and error == "OPEN" and "2025-03" <= stamp[:7] <= "2025-08")
+    got = Counter(iter_failures(db, pin_numbers=pins, error_types=["OPEN"], since="2025-03", until="2025-08"))
+    assert got == expected
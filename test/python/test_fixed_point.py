@@ -0,0 +1,99 @@
+import itertools
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+import fixed_point
+
+
+def test_to_um_round_trip_is_exact_for_three_decimals():
+    values = np.array([[0.001, -12.345], [1.002, 999.999], [-0.0004, 0.18]])
+    um = fixed_point.to_um(values)
+    assert um.dtype == np.int32
+    assert um.tolist() == [[1, -12345], [1002, 999999], [0, 180]]
+    assert np.array_equal(fixed_point.to_um(fixed_point.to_mm(um)), um)
+
+
+@pytest.mark.parametrize("value", [np.nan, np.inf, (fixed_point.MAX_UM + 1) / fixed_point.UM_PER_MM])
+def test_to_um_rejects_unrepresentable_values(value):
+    with pytest.raises(ValueError):
+        fixed_point.to_um([value])
+
+
+def test_same_point_compares_on_the_micrometre_grid():
+    assert fixed_point.same_point((0.1 + 0.2, 1.0), (0.3, 1.0))
+    assert not fixed_point.same_point((0.3, 1.0), (0.301, 1.0))
+
+
+def test_point_keys_and_dedupe_are_exact():
+    um = np.array([[-1, -1], [-1, 0], [0, -1], [-1, -1], [0, -1]], dtype=np.int32)
+    keys = fixed_point.point_keys(um)
+    assert len(set(keys.tolist())) == 3
+    unique, first, inverse, counts = fixed_point.dedupe_points(um)
+    assert np.array_equal(unique[inverse], um)
+    assert np.array_equal(um[first], unique)
+    assert sorted(counts.tolist()) == [1, 2, 2]
+
+
+def test_orientation_is_exact_near_the_coordinate_limit():
+    big = fixed_point.MAX_UM
+    a = np.array([-big, -big])
+    b = np.array([big, big])
+    # 浮点叉积会把这三个点判成共线
+    c = np.array([big - 1, big])
+    assert fixed_point.orientation(a, b, c) == 1
+    assert fixed_point.orientation(a, b, np.array([0, 0])) == 0
+    assert fixed_point.orientation(b, a, c) == -1
+
+
+def _reference_intersect(p1, p2, q1, q2):
+    """All-rational reference: parametric overlap of the two segments."""
+    def sub(a, b):
+        return a[0] - b[0], a[1] - b[1]
+
+    def cross(a, b):
+        return a[0] * b[1] - a[1] * b[0]
+
+    r, s = sub(p2, p1), sub(q2, q1)
+    denom = cross(r, s)
+    qp = sub(q1, p1)
+    if denom != 0:
+        t = Fraction(cross(qp, s), denom)
+        u = Fraction(cross(qp, r), denom)
+        return 0 <= t <= 1 and 0 <= u <= 1
+    if cross(qp, r) != 0:
+        return False
+    # 共线：比较在非竖直方向上的投影区间
+    axis = 0 if p1[0] != p2[0] else 1
+    lo_p, hi_p = sorted((p1[axis], p2[axis]))
+    lo_q, hi_q = sorted((q1[axis], q2[axis]))
+    return max(lo_p, lo_q) <= min(hi_p, hi_q)
+
+
+def test_segments_intersect_matches_rational_reference_on_degenerate_grid():
+    rng = np.random.default_rng(0)
+    # 小网格上大量共线、共点、零长度线段
+    segments = rng.integers(-3, 4, size=(5000, 4, 2))
+    got = fixed_point.segments_intersect(segments[:, 0], segments[:, 1], segments[:, 2], segments[:, 3])
+    for quad, result in zip(segments.tolist(), got.tolist()):
+        p1, p2, q1, q2 = map(tuple, quad)
+        if p1 == p2 or q1 == q2:
+            # 零长度线段在 build_segments 中已被去掉
+            continue
+        assert result == _reference_intersect(p1, p2, q1, q2), quad
+
+
+def test_line_intersection_is_rational():
+    x, y = fixed_point.line_intersection((0, 0), (3, 1), (0, 1), (3, 0))
+    assert (x, y) == (Fraction(3, 2), Fraction(1, 2))
+    assert fixed_point.intersection_point_um((0, 0), (3, 1), (0, 1), (3, 0)) == (2, 0)
+    assert fixed_point.intersection_point_mm((0, 0), (0.003, 0.001), (0, 0.001), (0.003, 0)) == (0.0015, 0.0005)
+    with pytest.raises(ValueError):
+        fixed_point.line_intersection((0, 0), (1, 1), (0, 1), (1, 2))
+
+
+def test_cross_matches_integer_arithmetic():
+    for o, a, b in itertools.product([(0, 0), (-5, 7)], [(3, 2), (2 ** 30, -2 ** 30)], [(1, 1), (-2 ** 29, 5)]):
+        expected = (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+        assert fixed_point.cross(o, a, b) == expected
@@ -0,0 +1,78 @@
+import json
+import random
+import datetime
+
+import numpy as np
+
+import fixed_point
+from adr_sharded import read_pin_table_sharded, shard_ranges
+from json_script import load_jig_geometry, build_output
+from parse_fails import parse_fail_log
+from pin_check import check_pins
+from pin_table import read_pin_table
+from tester_sim import write_block_logs
+
+RUT_FILES = ["G8360-TEST-TOP-JIGUNIT1.rut", "G8360-TEST-TOP-JIGUNIT2.rut",
+             "G8360-TEST-BOT-JIGUNIT1.rut", "G8360-TEST-BOT-JIGUNIT2.rut", "G8360-TEST-BOT-JIGUNIT3.rut"]
+ADR_FILE = "G8360-TEST.ADR"
+
+
+def _assert_same_table(a, b):
+    assert np.array_equal(a.no, b.no)
+    assert np.array_equal(a.xy_um, b.xy_um)
+    assert np.array_equal(a.side, b.side)
+    assert np.array_equal(a.unit, b.unit)
+
+
+def test_adr_coordinates_survive_the_micrometre_grid(fixture_path):
+    table = read_pin_table(fixture_path(ADR_FILE))
+    assert len(table) > 0
+    assert np.array_equal(fixed_point.to_um(table.xy), table.xy_um)
+
+
+def test_sharded_read_matches_single_process(fixture_path):
+    path = fixture_path(ADR_FILE)
+    ranges = shard_ranges(path, 7)
+    assert ranges[0][0] == 0 and all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    _assert_same_table(read_pin_table_sharded(path, workers=3, min_size=0), read_pin_table(path))
+
+
+def test_sharded_read_handles_tiny_and_malformed_files(tmp_path):
+    path = tmp_path / "tiny.ADR"
+    path.write_text("1 X 0.001 Y -2.5 A U1\nbroken line\n2 X 1.000 Y 2.000 B\n\n3 X 3.5 Y 4.25 A U2")
+    _assert_same_table(read_pin_table_sharded(str(path), workers=4, min_size=0), read_pin_table(str(path)))
+
+
+def test_jig_geometry_round_trips_through_json(fixture_path):
+    rut_files = [fixture_path(name) for name in RUT_FILES]
+    adr_file = fixture_path(ADR_FILE)
+    units, pin_table = load_jig_geometry(rut_files, adr_file, adr_workers=1)
+    assert [name for name, _ in units] == RUT_FILES
+    assert len(pin_table) == len(read_pin_table(adr_file))
+
+    output = json.loads(json.dumps(build_output(units, pin_table, adr_file)))
+    pins = output['adr_data']['side_a'] + output['adr_data']['side_b']
+    assert len(pins) == len(pin_table)
+    xy = np.array([[p['x'], p['y']] for p in pins])
+    assert np.array_equal(fixed_point.to_mm(fixed_point.to_um(xy)), xy)
+
+
+def test_pin_check_on_fixture_is_consistent(fixture_path):
+    table = read_pin_table(fixture_path(ADR_FILE))
+    report = check_pins(table, 0.18, limit=10)
+    numbers, counts = np.unique(table.no, return_counts=True)
+    assert report['pins'] == len(table)
+    assert report['duplicate_number_count'] == int((counts > 1).sum())
+    assert len(report['too_close']) <= 10
+    assert all(pair['distance'] <= 0.18 for pair in report['too_close'])
+
+
+def test_generated_logs_parse_back(tmp_path):
+    rng = random.Random(3)
+    moment = datetime.datetime(2025, 1, 1, 8, 0, 0)
+    csv_path, _, count = write_block_logs(str(tmp_path), moment, list(range(1, 500)), 40, rng)
+    parsed = parse_fail_log(csv_path)
+    # SPARK 行只有 Pin1，其余行各有 Pin1/Pin2
+    assert count == 40
+    assert 40 <= len(parsed) <= 80
+    assert all(1 <= entry['pin'] < 500 for entry in parsed)
@@ -0,0 +1,75 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import fixed_point
+from outline_check import build_segments, find_intersections
+
+
+def _all_pairs(segments):
+    """O(n²) reference built on the vectorized exact predicate."""
+    expected = set()
+    for a, b in itertools.combinations(segments, 2):
+        p1, p2 = np.array([a.x1, a.y1]), np.array([a.x2, a.y2])
+        q1, q2 = np.array([b.x1, b.y1]), np.array([b.x2, b.y2])
+        if fixed_point.segments_intersect(p1, p2, q1, q2):
+            expected.add((a.unit, b.unit))
+    return expected
+
+
+def _found_pairs(segments, closed, counts):
+    order = {seg.unit: seg.id for seg in segments}
+    found = set()
+    for record in find_intersections(segments, closed, counts):
+        pair = sorted((record['unit_a'], record['unit_b']), key=order.get)
+        found.add(tuple(pair))
+    return found
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_sweep_matches_all_pairs_on_degenerate_inputs(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(2, 60))
+    units = []
+    for k in range(n):
+        if rng.random() < 0.5:
+            # 小网格：共点、共线重叠、竖直线段和端点相接
+            p, q = rng.integers(0, 8, size=(2, 2)) * 0.5
+        else:
+            p, q = rng.uniform(0, 4, size=(2, 2))
+        if rng.random() < 0.15:
+            q[0] = p[0]
+        units.append((f"u{k}", [tuple(p), tuple(q)]))
+    segments, closed, counts = build_segments(units)
+    # 每个单元只有一条线段，没有相邻线段，全部相交对都应报告
+    assert _found_pairs(segments, closed, counts) == _all_pairs(segments)
+
+
+def test_many_segments_through_one_point():
+    units = [(f"u{k}", [(-np.cos(t), -np.sin(t)), (np.cos(t), np.sin(t))])
+             for k, t in enumerate(np.linspace(0, np.pi, 9, endpoint=False))]
+    segments, closed, counts = build_segments(units)
+    records = find_intersections(segments, closed, counts)
+    assert len(records) == 9 * 8 // 2
+    assert {(r['x'], r['y'], r['kind']) for r in records} == {(0.0, 0.0, "cross")}
+
+
+def test_closed_outline_adjacency_is_not_reported():
+    square = [(0, 0), (1, 0), (1, 1), (0, 1), (0, 0)]
+    # 同一直线被拆成两段 G01
+    split = [(0, 0), (0.5, 0), (1, 0), (1, 1), (0, 1), (0, 0)]
+    for coords in (square, split):
+        segments, closed, counts = build_segments([("A", coords)])
+        assert find_intersections(segments, closed, counts) == []
+
+
+def test_self_crossing_and_fold_back_are_reported():
+    bowtie = [(0, 0), (1, 1), (1, 0), (0, 1), (0, 0)]
+    segments, closed, counts = build_segments([("A", bowtie)])
+    records = find_intersections(segments, closed, counts)
+    assert [(r['x'], r['y'], r['kind']) for r in records] == [(0.5, 0.5, "cross")]
+
+    fold = [(0, 0), (2, 0), (1, 0)]
+    segments, closed, counts = build_segments([("B", fold)])
+    assert [r['kind'] for r in find_intersections(segments, closed, counts)] == ["overlap"]
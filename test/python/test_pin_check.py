@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+import fixed_point
+from jig_watch import diff_pin_tables
+from pin_check import find_close_pairs, check_pins
+from pin_table import PinTable
+
+
+def test_pitch_boundary_is_exact():
+    # 0.28 - 0.1 在浮点中不等于 0.18，整数微米比较下正好等于最小间距，不算过近
+    xy_um = fixed_point.to_um(np.array([[0.1, 0.7], [0.28, 0.7], [0.1, 0.88], [0.3, 0.3], [0.3, 0.479]]))
+    i, j, d = find_close_pairs(xy_um, 0.18)
+    assert i.tolist() == [3] and j.tolist() == [4]
+    assert d.tolist() == [0.179]
+
+
+def test_find_close_pairs_matches_brute_force():
+    rng = np.random.default_rng(1)
+    xy_um = rng.integers(0, 5000, (2000, 2))
+    xy_um[100:110] = xy_um[0]
+    i, j, d = find_close_pairs(xy_um, 0.18)
+    diff = xy_um[:, None, :] - xy_um[None, :, :]
+    a, b = np.nonzero(np.triu((diff ** 2).sum(axis=2) < 180 ** 2, 1))
+    assert np.array_equal(i, a) and np.array_equal(j, b)
+    assert np.allclose(d, np.hypot(*(xy_um[a] - xy_um[b]).T) / 1000)
+
+
+@pytest.mark.parametrize("pitch", [0, -0.1, float("nan")])
+def test_non_positive_pitch_raises(pitch):
+    table = PinTable([1, 2], [0.0, 0.1], [0.0, 0.0], ["A", "A"])
+    with pytest.raises(ValueError):
+        find_close_pairs(table.xy_um, pitch)
+    with pytest.raises(ValueError):
+        check_pins(table, pitch)
+
+
+def test_check_pins_reports_duplicates_and_close_pairs():
+    table = PinTable([1, 2, 2, 3, 4], [0.0, 0.0, 1.0, 1.1, 1.0], [0.0, 0.0, 0.0, 0.0, 0.0], ["A", "A", "A", "A", "B"])
+    report = check_pins(table, 0.18)
+    assert report['duplicate_number_count'] == 1
+    assert report['duplicate_positions'] == [{'side': 'A', 'x': 0.0, 'y': 0.0, 'pins': [1, 2]}]
+    assert report['too_close_count'] == 1
+
+
+def test_jig_watch_moves_are_exact():
+    before = PinTable.from_um([1, 2, 3], [[0, 0], [10, 10], [20, 20]], ["A", "A", "A"])
+    after = PinTable.from_um([1, 2, 4], [[0, 0], [10, 11], [20, 20]], ["A", "A", "A"])
+    delta = diff_pin_tables(before, after)['side_a']
+    assert [p['no'] for p in delta['moved']] == [2]
+    assert [p['no'] for p in delta['added']] == [4]
+    assert [p['no'] for p in delta['removed']] == [3]
+    assert diff_pin_tables(before, before.with_xy(before.xy))['side_a']['moved'] == []